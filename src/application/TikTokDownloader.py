@@ -301,6 +301,8 @@ class TikTokDownloader:
             self.running = example.running
         except KeyboardInterrupt:
             self.running = False
+        finally:
+            await example.downloader.uploader.close()
 
     async def monitor(self):
         await self.monitor_clipboard()
@@ -17,6 +17,7 @@ from urllib.parse import quote, urljoin, urlparse, urlencode
 from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
 from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from pydantic import TypeAdapter
 from pyperclip import paste
 from uvicorn import Config, Server
 
@@ -81,6 +82,11 @@ if TYPE_CHECKING:
 
 __all__ = ["APIServer"]
 
+_DOUYIN_USERS = TypeAdapter(list[DouyinUser])
+_DOUYIN_COOKIES = TypeAdapter(list[DouyinCookie])
+_DOUYIN_PLAYLISTS = TypeAdapter(list[DouyinPlaylist])
+_DOUYIN_WORKS = TypeAdapter(list[DouyinWork])
+
 
 def token_dependency(token: str = Header(None)):
     if not is_valid_token(token):
@@ -745,10 +751,12 @@ class APIServer(TikTok):
         ]
         if matched:
             primary = matched[0]
-            for duplicate in matched[1:]:
-                duplicate_id = int(duplicate.get("id", 0) or 0)
-                if duplicate_id:
-                    await self.database.delete_douyin_cookie(duplicate_id)
+            duplicate_ids = [
+                duplicate_id
+                for duplicate in matched[1:]
+                if (duplicate_id := int(duplicate.get("id", 0) or 0))
+            ]
+            await self.database.delete_douyin_cookies(duplicate_ids)
             account_name = self._resolve_cookie_account(
                 account,
                 primary.get("account", ""),
@@ -3123,6 +3131,7 @@ class APIServer(TikTok):
                 self._live_monitor_task.cancel()
                 self._live_monitor_task = None
             await self.live_recorder.shutdown()
+            await self.downloader.uploader.close()
 
         @self.server.get(
             "/",
@@ -3379,7 +3388,9 @@ class APIServer(TikTok):
         )
         async def list_douyin_users(token: str = Depends(token_dependency)):
             rows = await self.database.list_douyin_users()
-            return [DouyinUser(**self._normalize_user_row(i)) for i in rows]
+            return _DOUYIN_USERS.validate_python(
+                [self._normalize_user_row(i) for i in rows]
+            )
 
         @self.server.get(
             "/admin/douyin/users/paged",
@@ -3396,9 +3407,11 @@ class APIServer(TikTok):
             page_size = min(max(page_size, 1), 100)
             total = await self.database.count_douyin_users()
             rows = await self.database.list_douyin_users_paged(page, page_size)
-            return DouyinUserPage(
+            return DouyinUserPage.model_construct(
                 total=total,
-                items=[DouyinUser(**self._normalize_user_row(i)) for i in rows],
+                items=_DOUYIN_USERS.validate_python(
+                    [self._normalize_user_row(i) for i in rows]
+                ),
             )
 
         @self.server.get(
@@ -3574,8 +3587,8 @@ class APIServer(TikTok):
             page_size = min(max(page_size, 1), 50)
             total = await self.database.count_douyin_playlists()
             rows = await self.database.list_douyin_playlists(page, page_size)
-            items = [DouyinPlaylist(**row) for row in rows]
-            return DouyinPlaylistPage(total=total, items=items)
+            items = _DOUYIN_PLAYLISTS.validate_python(rows)
+            return DouyinPlaylistPage.model_construct(total=total, items=items)
 
         @self.server.post(
             "/admin/douyin/playlists",
@@ -3979,8 +3992,8 @@ class APIServer(TikTok):
             row = await self.database.get_douyin_user(sec_user_id)
             if row and bool(row.get("auto_update", 0)):
                 self._trigger_user_auto_update_now(sec_user_id)
-            items = [DouyinWork(**i) for i in result.get("items", [])]
-            return DouyinDailyWorkPage(total=len(items), items=items)
+            items = _DOUYIN_WORKS.validate_python(result.get("items", []))
+            return DouyinDailyWorkPage.model_construct(total=len(items), items=items)
 
         @self.server.get(
             "/admin/douyin/users/{sec_user_id}/live",
@@ -4039,7 +4052,9 @@ class APIServer(TikTok):
         )
         async def list_douyin_cookies(token: str = Depends(token_dependency)):
             rows = await self.database.list_douyin_cookies()
-            return [DouyinCookie(**self._normalize_cookie_row(i)) for i in rows]
+            return _DOUYIN_COOKIES.validate_python(
+                [self._normalize_cookie_row(i) for i in rows]
+            )
 
         @self.server.post(
             "/admin/douyin/cookies",
@@ -4169,8 +4184,7 @@ class APIServer(TikTok):
             page = max(page, 1)
             page_size = min(max(page_size, 1), 100)
             today = self._today_str()
-            total = await self.database.count_douyin_works_today(today)
-            rows = await self.database.list_douyin_works_today(
+            rows, total = await self.database.list_and_count_douyin_works_today(
                 today,
                 page,
                 page_size,
@@ -4200,9 +4214,11 @@ class APIServer(TikTok):
                 page,
                 page_size,
             )
-            return DouyinUserPage(
+            return DouyinUserPage.model_construct(
                 total=total,
-                items=[DouyinUser(**self._normalize_user_row(i)) for i in rows],
+                items=_DOUYIN_USERS.validate_python(
+                    [self._normalize_user_row(i) for i in rows]
+                ),
             )
 
         @self.server.get(
@@ -4285,8 +4301,8 @@ class APIServer(TikTok):
             page_size = min(max(page_size, 1), 100)
             total = await self.database.count_douyin_playlists()
             rows = await self.database.list_douyin_playlists(page, page_size)
-            items = [DouyinPlaylist(**row) for row in rows]
-            return DouyinPlaylistPage(total=total, items=items)
+            items = _DOUYIN_PLAYLISTS.validate_python(rows)
+            return DouyinPlaylistPage.model_construct(total=total, items=items)
 
         @self.server.get(
             "/client/douyin/users/with-works",
@@ -4300,10 +4316,14 @@ class APIServer(TikTok):
         ):
             page = max(page, 1)
             page_size = min(max(page_size, 1), 500)
-            total = await self.database.count_douyin_users_with_works()
-            rows = await self.database.list_douyin_users_with_works(page, page_size)
-            items = [DouyinUser(**self._normalize_user_row(i)) for i in rows]
-            return DouyinUserPage(total=total, items=items)
+            rows, total = await self.database.list_and_count_douyin_users_with_works(
+                page,
+                page_size,
+            )
+            items = _DOUYIN_USERS.validate_python(
+                [self._normalize_user_row(i) for i in rows]
+            )
+            return DouyinUserPage.model_construct(total=total, items=items)
 
         @self.server.get(
             "/client/douyin/playlists/{playlist_id}/feed",
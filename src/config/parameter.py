@@ -74,6 +74,7 @@ class Parameter:
             "remote_root": "/DouK-Downloader",
             "timeout": 30,
             "verify_ssl": True,
+            "verify_size": False,
         },
     }
 
@@ -1102,6 +1103,10 @@ class Parameter:
             config["webdav"].get("verify_ssl", True),
             default=True,
         )
+        config["webdav"]["verify_size"] = cls._parse_config_bool(
+            config["webdav"].get("verify_size", False),
+            default=False,
+        )
         if not config["webdav"]["origin_base_url"]:
             config["webdav"]["origin_base_url"] = config["webdav"]["base_url"]
         return config
@@ -104,6 +104,7 @@ class Settings:
                 "remote_root": "/DouK-Downloader",
                 "timeout": 30,
                 "verify_ssl": True,
+                "verify_size": False,
             },
         },
         "douyin_platform": True,
@@ -1,17 +1,180 @@
-from asyncio import CancelledError
-from contextlib import suppress
-from datetime import datetime
+from asyncio import CancelledError, Event, Lock, Queue, create_task, wait_for
+from contextlib import asynccontextmanager, suppress
+from json import dumps
+from logging import getLogger
+from os import cpu_count
 from shutil import move
+from time import localtime, strftime, time
+from typing import Final
 
 from aiosqlite import Row, connect
 
 from ..custom import PROJECT_ROOT
+from ..tools import BloomFilter
 
 __all__ = ["Database"]
 
+_LOGGER: Final = getLogger(__name__)
+_SQL_USER_COLUMNS: Final = """id, sec_user_id, uid, nickname, avatar, cover, has_works,
+    status, is_live, has_new_today, auto_update, update_window_start,
+    update_window_end, last_live_at, last_new_at, last_fetch_at, created_at,
+    updated_at"""
+_SQL_LIST_USERS: Final = f"""SELECT {_SQL_USER_COLUMNS}
+    FROM douyin_user
+    ORDER BY updated_at DESC;"""
+_SQL_LIST_USERS_WITH_WORKS: Final = f"""SELECT {_SQL_USER_COLUMNS}
+    FROM douyin_user
+    WHERE sec_user_id IN (SELECT sec_user_id FROM douyin_work)
+    ORDER BY updated_at DESC
+    LIMIT ? OFFSET ?;"""
+_SQL_LIST_COUNT_USERS_WITH_WORKS: Final = f"""SELECT {_SQL_USER_COLUMNS},
+    COUNT(1) OVER () AS total_count
+    FROM douyin_user
+    WHERE sec_user_id IN (SELECT sec_user_id FROM douyin_work)
+    ORDER BY updated_at DESC
+    LIMIT ? OFFSET ?;"""
+_SQL_LIST_USERS_PAGED: Final = f"""SELECT {_SQL_USER_COLUMNS}
+    FROM douyin_user
+    ORDER BY updated_at DESC
+    LIMIT ? OFFSET ?;"""
+_SQL_LIST_USERS_AUTO_UPDATE: Final = f"""SELECT {_SQL_USER_COLUMNS}
+    FROM douyin_user
+    WHERE auto_update=1
+    ORDER BY updated_at DESC;"""
+_SQL_GET_USER: Final = f"""SELECT {_SQL_USER_COLUMNS}, live_width, live_height
+    FROM douyin_user
+    WHERE sec_user_id=?;"""
+_SQL_UPSERT_USER: Final = f"""INSERT INTO douyin_user (
+        sec_user_id, uid, nickname, avatar, cover, has_works, status,
+        last_fetch_at, created_at, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(sec_user_id) DO UPDATE SET
+        uid=excluded.uid,
+        nickname=excluded.nickname,
+        avatar=excluded.avatar,
+        cover=excluded.cover,
+        has_works=excluded.has_works,
+        status=excluded.status,
+        last_fetch_at=excluded.last_fetch_at,
+        updated_at=excluded.updated_at
+    RETURNING {_SQL_USER_COLUMNS};"""
+_SQL_DELETE_USER: Final = "DELETE FROM douyin_user WHERE sec_user_id=?;"
+_SQL_UPDATE_USER_LIVE: Final = """UPDATE douyin_user
+    SET is_live=:is_live,
+        last_live_at=CASE WHEN :is_live=1 THEN :now ELSE last_live_at END,
+        updated_at=:now
+    WHERE sec_user_id=:sec_user_id AND (:is_live=1 OR is_live!=0);"""
+_SQL_UPDATE_USER_LIVE_SIZE: Final = """UPDATE douyin_user
+    SET live_width=:width, live_height=:height, updated_at=:now
+    WHERE sec_user_id=:sec_user_id
+      AND (live_width!=:width OR live_height!=:height);"""
+_SQL_UPDATE_USER_NEW: Final = """UPDATE douyin_user
+    SET has_new_today=:has_new,
+        last_new_at=CASE WHEN :has_new=1 THEN :now ELSE last_new_at END,
+        updated_at=:now
+    WHERE sec_user_id=:sec_user_id AND (:has_new=1 OR has_new_today!=0);"""
+_SQL_UPDATE_USER_FETCH_TIME: Final = """UPDATE douyin_user
+    SET last_fetch_at=?,
+        updated_at=?
+    WHERE sec_user_id=?;"""
+_SQL_CLEAR_USER_NEW: Final = """UPDATE douyin_user
+    SET has_new_today=0, updated_at=?
+    WHERE sec_user_id=? AND has_new_today!=0;"""
+_SQL_UPDATE_USER_SETTINGS: Final = """UPDATE douyin_user
+    SET auto_update=?, update_window_start=?, update_window_end=?, updated_at=?
+    WHERE sec_user_id=?;"""
+_SQL_UPDATE_USER_PROFILE: Final = """UPDATE douyin_user
+    SET uid=CASE WHEN :uid!='' THEN :uid ELSE uid END,
+        nickname=CASE WHEN :nickname!='' THEN :nickname ELSE nickname END,
+        avatar=CASE WHEN :avatar!='' THEN :avatar ELSE avatar END,
+        cover=CASE WHEN :cover!='' THEN :cover ELSE cover END,
+        updated_at=:now
+    WHERE sec_user_id=:sec_user_id
+      AND (
+        (:uid!='' AND :uid!=uid)
+        OR (:nickname!='' AND :nickname!=nickname)
+        OR (:avatar!='' AND :avatar!=avatar)
+        OR (:cover!='' AND :cover!=cover)
+      );"""
+
+_SQL_GET_SCHEDULE: Final = """SELECT id, enabled, times_text, updated_at
+    FROM douyin_schedule WHERE id=1;"""
+_SQL_UPSERT_SCHEDULE: Final = """INSERT INTO douyin_schedule (
+        id, enabled, times_text, updated_at
+    ) VALUES (1, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        enabled=excluded.enabled,
+        times_text=excluded.times_text,
+        updated_at=excluded.updated_at;"""
+
+_SQL_COOKIE_COLUMNS: Final = """id, account, cookie, cookie_hash, status, fail_count,
+    last_used_at, last_failed_at, created_at, updated_at"""
+_SQL_LIST_COOKIES: Final = f"""SELECT {_SQL_COOKIE_COLUMNS}
+    FROM douyin_cookie
+    WHERE (:status IS NULL OR status=:status)
+    ORDER BY updated_at DESC;"""
+_SQL_GET_COOKIE_BY_HASH: Final = f"""SELECT {_SQL_COOKIE_COLUMNS}
+    FROM douyin_cookie
+    WHERE cookie_hash=?;"""
+_SQL_UPSERT_COOKIE: Final = f"""INSERT INTO douyin_cookie (
+        account, cookie, cookie_hash, status, fail_count,
+        last_used_at, last_failed_at, created_at, updated_at
+    ) VALUES (?, ?, ?, 'active', 0, '', '', ?, ?)
+    ON CONFLICT(cookie_hash) DO UPDATE SET
+        account=excluded.account,
+        cookie=excluded.cookie,
+        status='active',
+        fail_count=0,
+        updated_at=excluded.updated_at
+    RETURNING {_SQL_COOKIE_COLUMNS};"""
+_SQL_UPDATE_COOKIE: Final = f"""UPDATE douyin_cookie
+    SET account=?,
+        cookie=?,
+        cookie_hash=?,
+        status='active',
+        fail_count=0,
+        last_failed_at='',
+        updated_at=?
+    WHERE id=?
+    RETURNING {_SQL_COOKIE_COLUMNS};"""
+_SQL_MARK_COOKIE_EXPIRED: Final = """UPDATE douyin_cookie
+    SET status='expired',
+        fail_count=fail_count + 1,
+        last_failed_at=?,
+        updated_at=?
+    WHERE id=?;"""
+_SQL_TOUCH_COOKIE: Final = """UPDATE douyin_cookie
+    SET last_used_at=?,
+        updated_at=?
+    WHERE id=?;"""
+_SQL_DELETE_COOKIE: Final = "DELETE FROM douyin_cookie WHERE id=?;"
+
 
 class Database:
     __FILE = "DouK-Downloader.db"
+    __READERS = min(4, cpu_count() or 1)
+    __CACHED_STATEMENTS = 256
+    __FLUSH_INTERVAL = 0.1
+    __FLUSH_PENDING = 64
+    __DOWNLOAD_FILTER_CAPACITY = 100_000
+    __SCHEMA_VERSION = 3
+    __now_second = 0
+    __now_text = ""
+    __PRAGMAS = (
+        "PRAGMA journal_mode=WAL;",
+        "PRAGMA synchronous=NORMAL;",
+        "PRAGMA temp_store=MEMORY;",
+        "PRAGMA cache_size=-64000;",
+        "PRAGMA mmap_size=268435456;",
+        "PRAGMA foreign_keys=ON;",
+        "PRAGMA busy_timeout=5000;",
+    )
+    __READER_PRAGMAS = (
+        "PRAGMA temp_store=MEMORY;",
+        "PRAGMA cache_size=-64000;",
+        "PRAGMA mmap_size=268435456;",
+        "PRAGMA busy_timeout=5000;",
+    )
 
     def __init__(
         self,
@@ -19,16 +182,62 @@ class Database:
         self.file = PROJECT_ROOT.joinpath(self.__FILE)
         self.database = None
         self.cursor = None
+        self.readers = []
+        self.__read_pool: Queue = Queue()
+        self.__write_lock = Lock()
+        self.__pending = 0
+        self.__touched: dict[int, str] = {}
+        self.__dirty = Event()
+        self.__full = Event()
+        self.__flusher = None
+        self.__downloaded = None
+        self.__user_count: int | None = None
+        self.__work_count: int | None = None
+        self.__schedule: dict | None = None
+        self.__schedule_version = 0
+        self.__cookies: dict[str | None, list[dict]] = {}
+        self.__cookies_version = 0
+        self.__columns: dict[str, tuple[str, ...]] = {}
 
     async def __connect_database(self):
-        self.database = await connect(self.file)
+        self.database = await connect(
+            self.file,
+            isolation_level=None,
+            cached_statements=self.__CACHED_STATEMENTS,
+        )
         self.database.row_factory = Row
+        for pragma in self.__PRAGMAS:
+            await self.database.execute(pragma)
         self.cursor = await self.database.cursor()
-        await self.__create_table()
-        await self.__ensure_columns()
+        await self.__create_schema()
+        await self.__analyze()
         await self.__write_default_config()
         await self.__write_default_option()
-        await self.database.commit()
+        await self.__load_download_filter()
+        await self.__connect_readers()
+        self.__flusher = create_task(self.__flush_loop())
+
+    async def __connect_readers(self):
+        uri = f"{self.file.as_uri()}?mode=ro"
+        for _ in range(self.__READERS):
+            reader = await connect(
+                uri,
+                uri=True,
+                cached_statements=self.__CACHED_STATEMENTS,
+            )
+            reader.row_factory = Row
+            for pragma in self.__READER_PRAGMAS:
+                await reader.execute(pragma)
+            self.readers.append(reader)
+            self.__read_pool.put_nowait(reader)
+
+    @asynccontextmanager
+    async def _acquire_read(self):
+        reader = await self.__read_pool.get()
+        try:
+            yield reader
+        finally:
+            self.__read_pool.put_nowait(reader)
 
     async def __create_table(self):
         await self.database.execute(
@@ -49,6 +258,7 @@ class Database:
             WORK_ID TEXT NOT NULL DEFAULT '',
             LOCAL_PATH TEXT NOT NULL DEFAULT '',
             LOCAL_SIZE INTEGER NOT NULL DEFAULT 0,
+            LOCAL_MTIME INTEGER NOT NULL DEFAULT 0,
             UPLOADED_AT TEXT NOT NULL,
             PRIMARY KEY (FILE_HASH, PROVIDER, DESTINATION)
             );"""
@@ -141,6 +351,7 @@ class Database:
             """CREATE TABLE IF NOT EXISTS douyin_playlist (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
+            item_count INTEGER NOT NULL DEFAULT 0,
             created_at TEXT NOT NULL,
             updated_at TEXT NOT NULL
             );"""
@@ -180,7 +391,26 @@ class Database:
             );"""
         )
 
+    async def __create_schema(self) -> None:
+        await self.database.execute("BEGIN IMMEDIATE;")
+        try:
+            await self.__create_table()
+            await self.__ensure_columns()
+            await self.__create_index()
+        except BaseException:
+            await self.database.rollback()
+            raise
+        await self.database.commit()
+
     async def __ensure_columns(self) -> None:
+        await self.cursor.execute("PRAGMA user_version;")
+        row = await self.cursor.fetchone()
+        if row[0] >= self.__SCHEMA_VERSION:
+            return
+        await self.__migrate_columns()
+        await self.database.execute(f"PRAGMA user_version={self.__SCHEMA_VERSION};")
+
+    async def __migrate_columns(self) -> None:
         columns = {
             "is_live": "INTEGER NOT NULL DEFAULT 0",
             "live_width": "INTEGER NOT NULL DEFAULT 0",
@@ -241,6 +471,7 @@ class Database:
         upload_columns = {
             "ORIGIN_DESTINATION": "TEXT NOT NULL DEFAULT ''",
             "WORK_ID": "TEXT NOT NULL DEFAULT ''",
+            "LOCAL_MTIME": "INTEGER NOT NULL DEFAULT 0",
         }
         for name, ddl in upload_columns.items():
             if name not in upload_existing:
@@ -265,6 +496,72 @@ class Database:
             await self.database.execute(
                 "ALTER TABLE douyin_schedule ADD COLUMN times_text TEXT NOT NULL DEFAULT '';"
             )
+        await self.cursor.execute("PRAGMA table_info(douyin_playlist);")
+        playlist_existing = {row["name"] for row in await self.cursor.fetchall()}
+        if "item_count" not in playlist_existing:
+            await self.database.execute(
+                "ALTER TABLE douyin_playlist ADD COLUMN item_count INTEGER NOT NULL DEFAULT 0;"
+            )
+            await self.database.execute(
+                """UPDATE douyin_playlist
+                SET item_count=(
+                    SELECT COUNT(1) FROM douyin_playlist_item pi
+                    WHERE pi.playlist_id = douyin_playlist.id
+                );"""
+            )
+
+    async def __create_index(self):
+        await self.database.execute(
+            """CREATE INDEX IF NOT EXISTS idx_cookie_status_updated
+            ON douyin_cookie(status, updated_at DESC);"""
+        )
+        await self.database.execute("DROP INDEX IF EXISTS idx_playlist_item_created;")
+        await self.database.execute(
+            """CREATE INDEX IF NOT EXISTS idx_playlist_item_order
+            ON douyin_playlist_item(playlist_id, created_at DESC, id DESC, aweme_id);"""
+        )
+        await self.database.execute(
+            """CREATE INDEX IF NOT EXISTS idx_work_sec_user
+            ON douyin_work(sec_user_id, create_ts DESC);"""
+        )
+        await self.database.execute(
+            """CREATE INDEX IF NOT EXISTS idx_work_create_date
+            ON douyin_work(create_date, create_ts DESC);"""
+        )
+        await self.database.execute(
+            """CREATE INDEX IF NOT EXISTS idx_work_sec_date
+            ON douyin_work(sec_user_id, create_date);"""
+        )
+        await self.database.execute(
+            """CREATE INDEX IF NOT EXISTS idx_user_live
+            ON douyin_user(is_live, last_live_at);"""
+        )
+        await self.database.execute(
+            """CREATE INDEX IF NOT EXISTS idx_user_updated
+            ON douyin_user(updated_at DESC);"""
+        )
+        await self.database.execute(
+            """CREATE INDEX IF NOT EXISTS idx_user_card
+            ON douyin_user(sec_user_id, nickname, avatar, uid);"""
+        )
+        await self.database.execute(
+            """CREATE INDEX IF NOT EXISTS idx_upload_local
+            ON upload_data(LOCAL_PATH, PROVIDER, DESTINATION);"""
+        )
+        await self.database.execute(
+            """CREATE INDEX IF NOT EXISTS idx_playlist_updated
+            ON douyin_playlist(updated_at DESC, id DESC);"""
+        )
+
+    async def __analyze(self):
+        await self.database.execute("PRAGMA analysis_limit=1000;")
+        await self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name='sqlite_stat1';"
+        )
+        if await self.cursor.fetchone():
+            await self.database.execute("PRAGMA optimize;")
+        else:
+            await self.database.execute("ANALYZE;")
 
     async def __write_default_config(self):
         await self.database.execute("""INSERT OR IGNORE INTO config_data (NAME, VALUE)
@@ -276,13 +573,114 @@ class Database:
         await self.database.execute("""INSERT OR IGNORE INTO option_data (NAME, VALUE)
                             VALUES ('Language', 'zh_CN');""")
 
-    async def _query_one(self, sql: str, params: tuple = ()):
-        async with self.database.execute(sql, params) as cursor:
-            return await cursor.fetchone()
-
-    async def _query_all(self, sql: str, params: tuple = ()):
-        async with self.database.execute(sql, params) as cursor:
-            return await cursor.fetchall()
+    async def __load_download_filter(self):
+        await self.cursor.execute("SELECT ID FROM download_data;")
+        rows = await self.cursor.fetchall()
+        self.__downloaded = self.__new_download_filter(len(rows))
+        for row in rows:
+            self.__downloaded.add(row["ID"])
+
+    def __new_download_filter(self, count: int = 0) -> BloomFilter:
+        return BloomFilter(max(count * 4, self.__DOWNLOAD_FILTER_CAPACITY))
+
+    async def _query_one(self, sql: str, params: tuple | dict = ()):
+        if self.__pending:
+            await self.flush()
+        async with self._acquire_read() as reader:
+            rows = await reader.execute_fetchall(sql, params)
+        return rows[0] if rows else None
+
+    async def _query_all(self, sql: str, params: tuple | dict = ()):
+        if self.__pending:
+            await self.flush()
+        async with self._acquire_read() as reader:
+            return await reader.execute_fetchall(sql, params)
+
+    async def _execute(self, sql: str, params: tuple | dict = ()):
+        async with self.__write_lock:
+            if not self.database.in_transaction:
+                await self.database.execute("BEGIN;")
+            cursor = await self.database.execute(sql, params)
+            self._mark_dirty()
+            return cursor
+
+    async def _execute_one(self, sql: str, params: tuple = ()):
+        async with self.__write_lock:
+            if not self.database.in_transaction:
+                await self.database.execute("BEGIN;")
+            rows = await self.database.execute_fetchall(sql, params)
+            self._mark_dirty()
+            return rows[0] if rows else None
+
+    def _mark_dirty(self):
+        self.__pending += 1
+        self.__dirty.set()
+        if self.__pending >= self.__FLUSH_PENDING:
+            self.__full.set()
+
+    async def __commit_pending(self):
+        pending = self.__pending
+        if self.__touched:
+            touched, self.__touched = self.__touched, {}
+            if not self.database.in_transaction:
+                await self.database.execute("BEGIN;")
+            await self.database.executemany(
+                _SQL_TOUCH_COOKIE,
+                [(now, now, i) for i, now in touched.items()],
+            )
+        if self.database.in_transaction:
+            await self.database.commit()
+        # 提交期间新增的 touch 仍留在 __touched 中，保留其计数等待下一轮
+        self.__pending -= pending
+        if self.__pending < self.__FLUSH_PENDING:
+            self.__full.clear()
+        if not self.__pending:
+            self.__dirty.clear()
+
+    async def flush(self):
+        async with self.__write_lock:
+            await self.__commit_pending()
+
+    async def __flush_loop(self):
+        while True:
+            await self.__dirty.wait()
+            with suppress(TimeoutError):
+                await wait_for(self.__full.wait(), self.__FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception:
+                _LOGGER.exception("Failed to commit pending database writes")
+                await self.__rollback_pending()
+
+    async def __rollback_pending(self):
+        async with self.__write_lock:
+            with suppress(Exception):
+                if self.database.in_transaction:
+                    await self.database.rollback()
+            self.__pending = len(self.__touched)
+            self.__full.clear()
+            if not self.__pending:
+                self.__dirty.clear()
+
+    @asynccontextmanager
+    async def _transaction(self):
+        async with self.__write_lock:
+            await self.__commit_pending()
+            await self.database.execute("BEGIN IMMEDIATE;")
+            try:
+                yield self.database
+            except BaseException:
+                await self.database.rollback()
+                raise
+            await self.database.commit()
+
+    async def _query_dicts(self, sql: str, params: tuple | dict = ()) -> list[dict]:
+        rows = await self._query_all(sql, params)
+        if not rows:
+            return []
+        if not (keys := self.__columns.get(sql)):
+            keys = self.__columns[sql] = tuple(rows[0].keys())
+        return [dict(zip(keys, i)) for i in rows]
 
     async def read_config_data(self):
         return await self._query_all("SELECT * FROM config_data")
@@ -295,27 +693,24 @@ class Database:
         name: str,
         value: int,
     ):
-        await self.database.execute(
+        await self._execute(
             "REPLACE INTO config_data (NAME, VALUE) VALUES (?,?)", (name, value)
         )
-        await self.database.commit()
 
     async def update_option_data(
         self,
         name: str,
         value: str,
     ):
-        await self.database.execute(
+        await self._execute(
             "REPLACE INTO option_data (NAME, VALUE) VALUES (?,?)", (name, value)
         )
-        await self.database.commit()
 
     async def update_mapping_data(self, id_: str, name: str, mark: str):
-        await self.database.execute(
+        await self._execute(
             "REPLACE INTO mapping_data (ID, NAME, MARK) VALUES (?,?,?)",
             (id_, name, mark),
         )
-        await self.database.commit()
 
     async def read_mapping_data(self, id_: str):
         return await self._query_one(
@@ -323,29 +718,37 @@ class Database:
         )
 
     async def has_download_data(self, id_: str) -> bool:
+        if self.__downloaded is not None and id_ not in self.__downloaded:
+            return False
         row = await self._query_one("SELECT ID FROM download_data WHERE ID=?", (id_,))
         return bool(row)
 
     async def write_download_data(self, id_: str):
-        await self.database.execute(
+        await self._execute(
             "INSERT OR IGNORE INTO download_data (ID) VALUES (?);", (id_,)
         )
-        await self.database.commit()
+        if self.__downloaded is not None:
+            self.__downloaded.add(id_)
 
-    async def has_upload_data(
+    async def get_upload_hash(
         self,
-        file_hash: str,
         provider: str,
         destination: str,
-    ) -> bool:
+        local_path: str,
+        local_size: int,
+        local_mtime: int,
+    ) -> str:
+        if not local_mtime:
+            return ""
         row = await self._query_one(
-            """SELECT 1
+            """SELECT FILE_HASH
             FROM upload_data
-            WHERE FILE_HASH=? AND PROVIDER=? AND DESTINATION=?
+            WHERE LOCAL_PATH=? AND PROVIDER=? AND DESTINATION=?
+              AND LOCAL_SIZE=? AND LOCAL_MTIME=?
             LIMIT 1;""",
-            (file_hash, provider, destination),
+            (local_path, provider, destination, int(local_size), int(local_mtime)),
         )
-        return bool(row)
+        return row["FILE_HASH"] if row else ""
 
     async def write_upload_data(
         self,
@@ -356,8 +759,9 @@ class Database:
         local_path: str,
         local_size: int,
         work_id: str = "",
+        local_mtime: int = 0,
     ) -> None:
-        await self.database.execute(
+        await self._execute(
             """INSERT INTO upload_data (
                 FILE_HASH,
                 PROVIDER,
@@ -366,8 +770,9 @@ class Database:
                 WORK_ID,
                 LOCAL_PATH,
                 LOCAL_SIZE,
+                LOCAL_MTIME,
                 UPLOADED_AT
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT(FILE_HASH, PROVIDER, DESTINATION) DO UPDATE SET
                 ORIGIN_DESTINATION=CASE
                     WHEN excluded.ORIGIN_DESTINATION!=''
@@ -381,6 +786,7 @@ class Database:
                 END,
                 LOCAL_PATH=excluded.LOCAL_PATH,
                 LOCAL_SIZE=excluded.LOCAL_SIZE,
+                LOCAL_MTIME=excluded.LOCAL_MTIME,
                 UPLOADED_AT=excluded.UPLOADED_AT;""",
             (
                 file_hash,
@@ -390,10 +796,10 @@ class Database:
                 work_id or "",
                 local_path,
                 int(local_size),
+                int(local_mtime or 0),
                 self._now_str(),
             ),
         )
-        await self.database.commit()
 
     async def get_latest_upload_by_work_id(self, work_id: str) -> dict:
         row = await self._query_one(
@@ -412,15 +818,17 @@ class Database:
             return
         if isinstance(ids, str):
             ids = [ids]
-        [await self.__delete_download_data(i) for i in ids]
-        await self.database.commit()
-
-    async def __delete_download_data(self, id_: str):
-        await self.database.execute("DELETE FROM download_data WHERE ID=?", (id_,))
+        async with self._transaction() as database:
+            await database.execute(
+                """DELETE FROM download_data
+                WHERE ID IN (SELECT value FROM json_each(?));""",
+                (dumps(list(ids)),),
+            )
 
     async def delete_all_download_data(self):
-        await self.database.execute("DELETE FROM download_data")
-        await self.database.commit()
+        async with self._transaction() as database:
+            await database.execute("DELETE FROM download_data")
+        self.__downloaded = self.__new_download_filter()
 
     async def __aenter__(self):
         self.compatible()
@@ -428,8 +836,20 @@ class Database:
         return self
 
     async def close(self):
+        if self.__flusher:
+            self.__flusher.cancel()
+            with suppress(CancelledError, Exception):
+                await self.__flusher
+            self.__flusher = None
+        await self.flush()
+        with suppress(Exception):
+            await self.database.execute("PRAGMA optimize;")
         with suppress(CancelledError):
             await self.cursor.close()
+        for reader in self.readers:
+            await reader.close()
+        self.readers.clear()
+        self.__read_pool = Queue()
         await self.database.close()
 
     async def __aexit__(self, exc_type, exc_value, traceback):
@@ -441,29 +861,21 @@ class Database:
         ).exists() and not self.file.exists():
             move(old, self.file)
 
-    @staticmethod
-    def _now_str() -> str:
-        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    @classmethod
+    def _now_str(cls) -> str:
+        if (second := int(time())) != cls.__now_second:
+            cls.__now_text = strftime("%Y-%m-%d %H:%M:%S", localtime(second))
+            cls.__now_second = second
+        return cls.__now_text
 
     async def list_douyin_users(self) -> list[dict]:
-        rows = await self._query_all(
-            """SELECT id, sec_user_id, uid, nickname, avatar, cover, has_works, status,
-            is_live, has_new_today, auto_update, update_window_start, update_window_end,
-            last_live_at, last_new_at, last_fetch_at, created_at, updated_at
-            FROM douyin_user
-            ORDER BY updated_at DESC;"""
-        )
-        return [dict(i) for i in rows]
+        return await self._query_dicts(_SQL_LIST_USERS)
 
     async def count_douyin_users_with_works(self) -> int:
         row = await self._query_one(
             """SELECT COUNT(1) AS total
             FROM douyin_user u
-            WHERE EXISTS (
-                SELECT 1 FROM douyin_work w
-                WHERE w.sec_user_id = u.sec_user_id
-                LIMIT 1
-            );"""
+            WHERE sec_user_id IN (SELECT sec_user_id FROM douyin_work);"""
         )
         return int(row["total"]) if row else 0
 
@@ -475,25 +887,37 @@ class Database:
         page = max(page, 1)
         page_size = max(page_size, 1)
         offset = (page - 1) * page_size
-        rows = await self._query_all(
-            """SELECT id, sec_user_id, uid, nickname, avatar, cover, has_works, status,
-            is_live, has_new_today, auto_update, update_window_start, update_window_end,
-            last_live_at, last_new_at, last_fetch_at, created_at, updated_at
-            FROM douyin_user u
-            WHERE EXISTS (
-                SELECT 1 FROM douyin_work w
-                WHERE w.sec_user_id = u.sec_user_id
-                LIMIT 1
-            )
-            ORDER BY updated_at DESC
-            LIMIT ? OFFSET ?;""",
+        return await self._query_dicts(
+            _SQL_LIST_USERS_WITH_WORKS,
+            (page_size, offset),
+        )
+
+    async def list_and_count_douyin_users_with_works(
+        self,
+        page: int,
+        page_size: int,
+    ) -> tuple[list[dict], int]:
+        page = max(page, 1)
+        page_size = max(page_size, 1)
+        offset = (page - 1) * page_size
+        rows = await self._query_dicts(
+            _SQL_LIST_COUNT_USERS_WITH_WORKS,
             (page_size, offset),
         )
-        return [dict(i) for i in rows]
+        if not rows:
+            if page <= 1:
+                return [], 0
+            return [], await self.count_douyin_users_with_works()
+        total = int(rows[0]["total_count"] or 0)
+        for row in rows:
+            del row["total_count"]
+        return rows, total
 
     async def count_douyin_users(self) -> int:
-        row = await self._query_one("SELECT COUNT(1) AS total FROM douyin_user;")
-        return int(row["total"]) if row else 0
+        if self.__user_count is None:
+            row = await self._query_one("SELECT COUNT(1) AS total FROM douyin_user;")
+            self.__user_count = int(row["total"]) if row else 0
+        return self.__user_count
 
     async def list_douyin_users_paged(
         self, page: int, page_size: int
@@ -501,27 +925,13 @@ class Database:
         page = max(page, 1)
         page_size = max(page_size, 1)
         offset = (page - 1) * page_size
-        rows = await self._query_all(
-            """SELECT id, sec_user_id, uid, nickname, avatar, cover, has_works, status,
-            is_live, has_new_today, auto_update, update_window_start, update_window_end,
-            last_live_at, last_new_at, last_fetch_at, created_at, updated_at
-            FROM douyin_user
-            ORDER BY updated_at DESC
-            LIMIT ? OFFSET ?;""",
+        return await self._query_dicts(
+            _SQL_LIST_USERS_PAGED,
             (page_size, offset),
         )
-        return [dict(i) for i in rows]
 
     async def get_douyin_user(self, sec_user_id: str) -> dict:
-        row = await self._query_one(
-            """SELECT id, sec_user_id, uid, nickname, avatar, cover, has_works, status,
-            is_live, live_width, live_height, has_new_today, auto_update,
-            update_window_start, update_window_end,
-            last_live_at, last_new_at, last_fetch_at, created_at, updated_at
-            FROM douyin_user
-            WHERE sec_user_id=?;""",
-            (sec_user_id,),
-        )
+        row = await self._query_one(_SQL_GET_USER, (sec_user_id,))
         return dict(row) if row else {}
 
     async def upsert_douyin_user(
@@ -535,20 +945,8 @@ class Database:
         status: str,
     ) -> dict:
         now = self._now_str()
-        await self.database.execute(
-            """INSERT INTO douyin_user (
-                sec_user_id, uid, nickname, avatar, cover, has_works, status,
-                last_fetch_at, created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(sec_user_id) DO UPDATE SET
-                uid=excluded.uid,
-                nickname=excluded.nickname,
-                avatar=excluded.avatar,
-                cover=excluded.cover,
-                has_works=excluded.has_works,
-                status=excluded.status,
-                last_fetch_at=excluded.last_fetch_at,
-                updated_at=excluded.updated_at;""",
+        row = await self._execute_one(
+            _SQL_UPSERT_USER,
             (
                 sec_user_id,
                 uid,
@@ -562,60 +960,35 @@ class Database:
                 now,
             ),
         )
-        await self.database.commit()
-        row = await self._query_one(
-            """SELECT id, sec_user_id, uid, nickname, avatar, cover, has_works, status,
-            is_live, has_new_today, auto_update, update_window_start, update_window_end,
-            last_live_at, last_new_at, last_fetch_at, created_at, updated_at
-            FROM douyin_user
-            WHERE sec_user_id=?;""",
-            (sec_user_id,),
-        )
+        self.__user_count = None
         return dict(row) if row else {}
 
     async def delete_douyin_user(self, sec_user_id: str) -> None:
-        await self.database.execute(
-            "DELETE FROM douyin_user WHERE sec_user_id=?;",
-            (sec_user_id,),
-        )
-        await self.database.commit()
+        async with self._transaction() as database:
+            await database.execute(_SQL_DELETE_USER, (sec_user_id,))
+        self.__user_count = None
 
     async def delete_douyin_user_with_works(self, sec_user_id: str) -> int:
-        row = await self._query_one(
-            "SELECT COUNT(1) AS total FROM douyin_work WHERE sec_user_id=?;",
-            (sec_user_id,),
-        )
-        total = int(row["total"]) if row else 0
-        await self.database.execute(
-            "DELETE FROM douyin_work WHERE sec_user_id=?;",
-            (sec_user_id,),
-        )
-        await self.database.execute(
-            "DELETE FROM douyin_user WHERE sec_user_id=?;",
-            (sec_user_id,),
-        )
-        await self.database.commit()
-        return total
+        async with self._transaction() as database:
+            cursor = await database.execute(
+                "DELETE FROM douyin_work WHERE sec_user_id=?;",
+                (sec_user_id,),
+            )
+            await database.execute(_SQL_DELETE_USER, (sec_user_id,))
+        self.__user_count = None
+        self.__work_count = None
+        return int(cursor.rowcount or 0)
 
     async def delete_orphan_douyin_works(self) -> int:
-        row = await self._query_one(
-            """SELECT COUNT(1) AS total
-            FROM douyin_work w
-            WHERE NOT EXISTS (
-                SELECT 1 FROM douyin_user u WHERE u.sec_user_id = w.sec_user_id
-            );"""
-        )
-        total = int(row["total"]) if row else 0
-        if total <= 0:
-            return 0
-        await self.database.execute(
-            """DELETE FROM douyin_work
-            WHERE NOT EXISTS (
-                SELECT 1 FROM douyin_user u WHERE u.sec_user_id = douyin_work.sec_user_id
-            );"""
-        )
-        await self.database.commit()
-        return total
+        async with self._transaction() as database:
+            cursor = await database.execute(
+                """DELETE FROM douyin_work
+                WHERE sec_user_id NOT IN (SELECT sec_user_id FROM douyin_user);"""
+            )
+        deleted = int(cursor.rowcount or 0)
+        if deleted:
+            self.__work_count = None
+        return deleted
 
     async def update_douyin_user_live(
         self,
@@ -623,15 +996,10 @@ class Database:
         is_live: bool,
     ) -> None:
         now = self._now_str()
-        await self.database.execute(
-            """UPDATE douyin_user
-            SET is_live=?,
-                last_live_at=CASE WHEN ?=1 THEN ? ELSE last_live_at END,
-                updated_at=?
-            WHERE sec_user_id=?;""",
-            (1 if is_live else 0, 1 if is_live else 0, now, now, sec_user_id),
+        await self._execute(
+            _SQL_UPDATE_USER_LIVE,
+            {"is_live": 1 if is_live else 0, "now": now, "sec_user_id": sec_user_id},
         )
-        await self.database.commit()
 
     async def update_douyin_user_live_size(
         self,
@@ -642,17 +1010,19 @@ class Database:
         if not width or not height:
             return
         now = self._now_str()
-        await self.database.execute(
-            """UPDATE douyin_user
-            SET live_width=?, live_height=?, updated_at=?
-            WHERE sec_user_id=?;""",
-            (int(width), int(height), now, sec_user_id),
+        await self._execute(
+            _SQL_UPDATE_USER_LIVE_SIZE,
+            {
+                "width": int(width),
+                "height": int(height),
+                "now": now,
+                "sec_user_id": sec_user_id,
+            },
         )
-        await self.database.commit()
 
     async def mark_running_live_records_interrupted(self) -> None:
         now = self._now_str()
-        await self.database.execute(
+        await self._execute(
             """UPDATE douyin_live_record
             SET status='interrupted',
                 ended_at=CASE WHEN ended_at='' THEN ? ELSE ended_at END,
@@ -660,7 +1030,6 @@ class Database:
             WHERE status='running';""",
             (now, now),
         )
-        await self.database.commit()
 
     async def create_douyin_live_record(
         self,
@@ -675,7 +1044,7 @@ class Database:
         output_file: str,
     ) -> int:
         now = self._now_str()
-        cursor = await self.database.execute(
+        cursor = await self._execute(
             """INSERT INTO douyin_live_record (
             sec_user_id,
             room_id,
@@ -713,7 +1082,6 @@ class Database:
                 now,
             ),
         )
-        await self.database.commit()
         return int(cursor.lastrowid or 0)
 
     async def update_douyin_live_record_retry(
@@ -724,7 +1092,7 @@ class Database:
     ) -> None:
         if not record_id:
             return
-        await self.database.execute(
+        await self._execute(
             """UPDATE douyin_live_record
             SET retry_count=?,
                 error=?,
@@ -737,7 +1105,6 @@ class Database:
                 int(record_id),
             ),
         )
-        await self.database.commit()
 
     async def finish_douyin_live_record(
         self,
@@ -748,13 +1115,17 @@ class Database:
         upload_origin_destination: str = "",
         work_aweme_id: str = "",
         error: str = "",
+        retry_count: int = 0,
+        uploaded: bool = False,
     ) -> None:
         if not record_id:
             return
         now = self._now_str()
-        await self.database.execute(
+        await self._execute(
             """UPDATE douyin_live_record
             SET status=?,
+                retry_count=MAX(retry_count, ?),
+                uploaded_at=CASE WHEN ? THEN ? ELSE uploaded_at END,
                 output_file=CASE WHEN ?!='' THEN ? ELSE output_file END,
                 upload_destination=CASE WHEN ?!='' THEN ? ELSE upload_destination END,
                 upload_origin_destination=CASE
@@ -767,6 +1138,9 @@ class Database:
             WHERE id=?;""",
             (
                 status or "finished",
+                max(int(retry_count), 0),
+                1 if uploaded else 0,
+                now,
                 output_file or "",
                 output_file or "",
                 upload_destination or "",
@@ -781,7 +1155,6 @@ class Database:
                 int(record_id),
             ),
         )
-        await self.database.commit()
 
     async def update_douyin_work_upload(
         self,
@@ -802,7 +1175,7 @@ class Database:
         if download_progress is not None:
             normalized = max(0, min(100, int(download_progress)))
         now = self._now_str()
-        await self.database.execute(
+        await self._execute(
             """UPDATE douyin_work
             SET upload_status=?,
                 upload_provider=CASE WHEN ?!='' THEN ? ELSE upload_provider END,
@@ -857,7 +1230,6 @@ class Database:
                 aweme_id,
             ),
         )
-        await self.database.commit()
 
     async def update_douyin_work_download_progress(
         self,
@@ -869,7 +1241,7 @@ class Database:
             return
         value = max(0, min(100, int(progress or 0)))
         now = self._now_str()
-        await self.database.execute(
+        await self._execute(
             """UPDATE douyin_work
             SET upload_status=CASE
                     WHEN upload_status='' OR upload_status='pending' THEN 'downloading'
@@ -887,7 +1259,6 @@ class Database:
                 aweme_id,
             ),
         )
-        await self.database.commit()
 
     async def insert_douyin_live_work(
         self,
@@ -909,7 +1280,7 @@ class Database:
         if not sec_user_id or not aweme_id:
             return
         now = self._now_str()
-        await self.database.execute(
+        await self._execute(
             """INSERT INTO douyin_work (
                 sec_user_id, aweme_id, desc, create_ts, create_date,
                 cover, play_count, width, height, work_type,
@@ -954,20 +1325,7 @@ class Database:
                 now,
             ),
         )
-        await self.database.commit()
-
-    async def mark_douyin_live_record_uploaded(self, record_id: int) -> None:
-        if not record_id:
-            return
-        now = self._now_str()
-        await self.database.execute(
-            """UPDATE douyin_live_record
-            SET uploaded_at=?,
-                updated_at=?
-            WHERE id=?;""",
-            (now, now, int(record_id)),
-        )
-        await self.database.commit()
+        self.__work_count = None
 
     async def update_douyin_work_size(
         self,
@@ -977,29 +1335,26 @@ class Database:
     ) -> None:
         if not aweme_id or not width or not height:
             return
-        await self.database.execute(
+        await self._execute(
             "UPDATE douyin_work SET width=?, height=? WHERE aweme_id=?;",
             (int(width), int(height), aweme_id),
         )
-        await self.database.commit()
 
     async def clear_douyin_work_local_path(self, aweme_id: str) -> None:
         if not aweme_id:
             return
-        await self.database.execute(
+        await self._execute(
             "UPDATE douyin_work SET local_path='' WHERE aweme_id=?;",
             (aweme_id,),
         )
-        await self.database.commit()
 
     async def set_douyin_work_local_path(self, aweme_id: str, local_path: str) -> None:
         if not aweme_id or not local_path:
             return
-        await self.database.execute(
+        await self._execute(
             "UPDATE douyin_work SET local_path=? WHERE aweme_id=?;",
             (str(local_path), aweme_id),
         )
-        await self.database.commit()
 
     async def get_latest_douyin_live_record_output(self, work_aweme_id: str) -> str:
         if not work_aweme_id:
@@ -1040,7 +1395,7 @@ class Database:
             return 0
         limit = min(max(int(limit or 1), 1), 2000)
         now = self._now_str()
-        cursor = await self.database.execute(
+        cursor = await self._execute(
             """UPDATE douyin_work
             SET upload_status='pending',
                 upload_message='自动补偿: 检测到超时僵尸任务，已重置',
@@ -1055,7 +1410,6 @@ class Database:
             );""",
             (now, stale_before, limit),
         )
-        await self.database.commit()
         return int(cursor.rowcount or 0)
 
     async def update_douyin_user_new(
@@ -1064,42 +1418,28 @@ class Database:
         has_new_today: bool,
     ) -> None:
         now = self._now_str()
-        await self.database.execute(
-            """UPDATE douyin_user
-            SET has_new_today=?,
-                last_new_at=CASE WHEN ?=1 THEN ? ELSE last_new_at END,
-                updated_at=?
-            WHERE sec_user_id=?;""",
-            (
-                1 if has_new_today else 0,
-                1 if has_new_today else 0,
-                now,
-                now,
-                sec_user_id,
-            ),
+        await self._execute(
+            _SQL_UPDATE_USER_NEW,
+            {
+                "has_new": 1 if has_new_today else 0,
+                "now": now,
+                "sec_user_id": sec_user_id,
+            },
         )
-        await self.database.commit()
 
     async def update_douyin_user_fetch_time(self, sec_user_id: str) -> None:
         now = self._now_str()
-        await self.database.execute(
-            """UPDATE douyin_user
-            SET last_fetch_at=?,
-                updated_at=?
-            WHERE sec_user_id=?;""",
+        await self._execute(
+            _SQL_UPDATE_USER_FETCH_TIME,
             (now, now, sec_user_id),
         )
-        await self.database.commit()
 
     async def clear_douyin_user_new(self, sec_user_id: str) -> None:
         now = self._now_str()
-        await self.database.execute(
-            """UPDATE douyin_user
-            SET has_new_today=0, updated_at=?
-            WHERE sec_user_id=?;""",
+        await self._execute(
+            _SQL_CLEAR_USER_NEW,
             (now, sec_user_id),
         )
-        await self.database.commit()
 
     async def update_douyin_user_settings(
         self,
@@ -1109,10 +1449,8 @@ class Database:
         window_end: str,
     ) -> None:
         now = self._now_str()
-        await self.database.execute(
-            """UPDATE douyin_user
-            SET auto_update=?, update_window_start=?, update_window_end=?, updated_at=?
-            WHERE sec_user_id=?;""",
+        await self._execute(
+            _SQL_UPDATE_USER_SETTINGS,
             (
                 1 if auto_update else 0,
                 window_start or "",
@@ -1121,7 +1459,6 @@ class Database:
                 sec_user_id,
             ),
         )
-        await self.database.commit()
 
     async def update_douyin_user_profile(
         self,
@@ -1132,47 +1469,50 @@ class Database:
         cover: str,
     ) -> None:
         now = self._now_str()
-        await self.database.execute(
-            """UPDATE douyin_user
-            SET uid=CASE WHEN ?!='' THEN ? ELSE uid END,
-                nickname=CASE WHEN ?!='' THEN ? ELSE nickname END,
-                avatar=CASE WHEN ?!='' THEN ? ELSE avatar END,
-                cover=CASE WHEN ?!='' THEN ? ELSE cover END,
-                updated_at=?
-            WHERE sec_user_id=?;""",
-            (
-                uid,
-                uid,
-                nickname,
-                nickname,
-                avatar,
-                avatar,
-                cover,
-                cover,
-                now,
-                sec_user_id,
-            ),
+        await self._execute(
+            _SQL_UPDATE_USER_PROFILE,
+            {
+                "uid": uid,
+                "nickname": nickname,
+                "avatar": avatar,
+                "cover": cover,
+                "now": now,
+                "sec_user_id": sec_user_id,
+            },
         )
-        await self.database.commit()
 
     async def list_douyin_users_auto_update(self) -> list[dict]:
-        rows = await self._query_all(
-            """SELECT id, sec_user_id, uid, nickname, avatar, cover, has_works, status,
-            is_live, has_new_today, auto_update, update_window_start, update_window_end,
-            last_live_at, last_new_at, last_fetch_at, created_at, updated_at
-            FROM douyin_user
-            WHERE auto_update=1
-            ORDER BY updated_at DESC;"""
-        )
-        return [dict(i) for i in rows]
+        return await self._query_dicts(_SQL_LIST_USERS_AUTO_UPDATE)
 
     async def insert_douyin_works(self, works: list[dict]) -> int:
         if not works:
             return 0
         now = self._now_str()
-        inserted = 0
-        for item in works:
-            cursor = await self.database.execute(
+        rows = [
+            (
+                item.get("sec_user_id", ""),
+                item.get("aweme_id", ""),
+                item.get("desc", ""),
+                int(item.get("create_ts") or 0),
+                item.get("create_date", ""),
+                item.get("cover", ""),
+                int(item.get("play_count") or 0),
+                int(item.get("width") or 0),
+                int(item.get("height") or 0),
+                item.get("work_type") or item.get("type") or "video",
+                now,
+                now,
+            )
+            for item in works
+        ]
+        aweme_ids = {row[1] for row in rows}
+        async with self._transaction() as database:
+            existing = await database.execute_fetchall(
+                """SELECT aweme_id FROM douyin_work
+                WHERE aweme_id IN (SELECT value FROM json_each(?));""",
+                (dumps(list(aweme_ids)),),
+            )
+            await database.executemany(
                 """INSERT INTO douyin_work (
                 sec_user_id, aweme_id, desc, create_ts, create_date,
                 cover, play_count, width, height, work_type, status_updated_at, created_at
@@ -1187,24 +1527,11 @@ class Database:
                     width=excluded.width,
                     height=excluded.height,
                     work_type=excluded.work_type;""",
-                (
-                    item.get("sec_user_id", ""),
-                    item.get("aweme_id", ""),
-                    item.get("desc", ""),
-                    int(item.get("create_ts") or 0),
-                    item.get("create_date", ""),
-                    item.get("cover", ""),
-                    int(item.get("play_count") or 0),
-                    int(item.get("width") or 0),
-                    int(item.get("height") or 0),
-                    item.get("work_type") or item.get("type") or "video",
-                    now,
-                    now,
-                ),
+                rows,
             )
-            if cursor.rowcount and cursor.rowcount > 0:
-                inserted += 1
-        await self.database.commit()
+        inserted = len(aweme_ids) - len(existing)
+        if self.__work_count is not None:
+            self.__work_count += inserted
         return inserted
 
     async def count_douyin_works_today(
@@ -1248,6 +1575,41 @@ class Database:
         page_size: int,
         work_types: tuple[str, ...] | None = None,
     ) -> list[dict]:
+        sql, params = self.__works_today_sql("", date_str, page, page_size, work_types)
+        return await self._query_dicts(sql, params)
+
+    async def list_and_count_douyin_works_today(
+        self,
+        date_str: str,
+        page: int,
+        page_size: int,
+        work_types: tuple[str, ...] | None = None,
+    ) -> tuple[list[dict], int]:
+        sql, params = self.__works_today_sql(
+            ",\n            COUNT(1) OVER () AS total_count",
+            date_str,
+            page,
+            page_size,
+            work_types,
+        )
+        rows = await self._query_dicts(sql, params)
+        if not rows:
+            if page <= 1:
+                return [], 0
+            return [], await self.count_douyin_works_today(date_str, work_types)
+        total = int(rows[0]["total_count"] or 0)
+        for row in rows:
+            del row["total_count"]
+        return rows, total
+
+    @staticmethod
+    def __works_today_sql(
+        extra: str,
+        date_str: str,
+        page: int,
+        page_size: int,
+        work_types: tuple[str, ...] | None,
+    ) -> tuple[str, tuple]:
         page = max(page, 1)
         page_size = max(page_size, 1)
         offset = (page - 1) * page_size
@@ -1259,7 +1621,9 @@ class Database:
             w.downloaded_at, w.uploaded_at,
             COALESCE(u.nickname, '') AS nickname,
             COALESCE(u.avatar, '') AS avatar,
-            COALESCE(u.uid, '') AS uid
+            COALESCE(u.uid, '') AS uid"""
+        sql += extra
+        sql += """
             FROM douyin_work w
             JOIN douyin_user u ON w.sec_user_id = u.sec_user_id
             WHERE w.create_date=?"""
@@ -1269,8 +1633,7 @@ class Database:
             params.extend(work_types)
         sql += "\n            ORDER BY w.create_ts DESC\n            LIMIT ? OFFSET ?;"
         params.extend((page_size, offset))
-        rows = await self._query_all(sql, tuple(params))
-        return [dict(i) for i in rows]
+        return sql, tuple(params)
 
     async def list_douyin_user_works_today(
         self,
@@ -1282,7 +1645,7 @@ class Database:
         page = max(page, 1)
         page_size = min(max(page_size, 1), 100)
         offset = (page - 1) * page_size
-        rows = await self._query_all(
+        return await self._query_dicts(
             """SELECT w.sec_user_id, w.aweme_id, w.desc, w.create_ts, w.create_date,
             w.cover, w.play_count, w.width, w.height, w.work_type,
             w.upload_status, w.upload_provider, w.upload_destination,
@@ -1298,7 +1661,6 @@ class Database:
             LIMIT ? OFFSET ?;""",
             (date_str, sec_user_id, page_size, offset),
         )
-        return [dict(i) for i in rows]
 
     async def count_douyin_user_works(
         self,
@@ -1324,10 +1686,11 @@ class Database:
         page: int,
         page_size: int,
         work_types: tuple[str, ...] | None = None,
+        after: tuple[int, str] | None = None,
     ) -> list[dict]:
         page = max(page, 1)
         page_size = min(max(page_size, 1), 100)
-        offset = (page - 1) * page_size
+        offset = 0 if after else (page - 1) * page_size
         params: list = [sec_user_id]
         sql = """SELECT w.sec_user_id, w.aweme_id, w.desc, w.create_ts, w.create_date,
             w.cover, w.play_count, w.width, w.height, w.work_type,
@@ -1344,10 +1707,15 @@ class Database:
             placeholders = ",".join(["?"] * len(work_types))
             sql += f"\n            AND w.work_type IN ({placeholders})"
             params.extend(work_types)
-        sql += "\n            ORDER BY w.create_ts DESC\n            LIMIT ? OFFSET ?;"
+        if after:
+            sql += "\n            AND (w.create_ts, w.aweme_id) < (?, ?)"
+            params.extend(after)
+        sql += (
+            "\n            ORDER BY w.create_ts DESC, w.aweme_id DESC"
+            "\n            LIMIT ? OFFSET ?;"
+        )
         params.extend((page_size, offset))
-        rows = await self._query_all(sql, tuple(params))
-        return [dict(i) for i in rows]
+        return await self._query_dicts(sql, tuple(params))
 
     async def list_douyin_user_pending_works(
         self,
@@ -1358,7 +1726,7 @@ class Database:
         if not sec_user_id:
             return []
         limit = min(max(int(limit or 1), 1), 500)
-        rows = await self._query_all(
+        return await self._query_dicts(
             """SELECT aweme_id, work_type, upload_status, status_updated_at
             FROM douyin_work
             WHERE sec_user_id=?
@@ -1367,7 +1735,6 @@ class Database:
             LIMIT ?;""",
             (sec_user_id, limit),
         )
-        return [dict(i) for i in rows]
 
     async def summarize_douyin_user_work_status(self, sec_user_id: str) -> dict:
         sec_user_id = (sec_user_id or "").strip()
@@ -1435,33 +1802,34 @@ class Database:
                 "uploaded": 0,
                 "failed": 0,
             }
-        row_data = dict(row)
         return {
-            "total": int(row_data.get("total") or 0),
-            "pending": int(row_data.get("pending") or 0),
-            "downloading": int(row_data.get("downloading") or 0),
-            "downloading_progress_total": int(
-                row_data.get("downloading_progress_total") or 0
-            ),
-            "downloaded": int(row_data.get("downloaded") or 0),
-            "uploading": int(row_data.get("uploading") or 0),
-            "uploaded": int(row_data.get("uploaded") or 0),
-            "failed": int(row_data.get("failed") or 0),
+            "total": int(row["total"] or 0),
+            "pending": int(row["pending"] or 0),
+            "downloading": int(row["downloading"] or 0),
+            "downloading_progress_total": int(row["downloading_progress_total"] or 0),
+            "downloaded": int(row["downloaded"] or 0),
+            "uploading": int(row["uploading"] or 0),
+            "uploaded": int(row["uploaded"] or 0),
+            "failed": int(row["failed"] or 0),
         }
 
     async def count_douyin_works_all(self) -> int:
-        row = await self._query_one("SELECT COUNT(1) AS total FROM douyin_work;")
-        return int(row["total"]) if row else 0
+        if self.__work_count is None:
+            row = await self._query_one("SELECT COUNT(1) AS total FROM douyin_work;")
+            self.__work_count = int(row["total"]) if row else 0
+        return self.__work_count
 
     async def list_douyin_works_all(
         self,
         page: int,
         page_size: int,
+        after: tuple[int, str] | None = None,
     ) -> list[dict]:
         page = max(page, 1)
         page_size = min(max(page_size, 1), 100)
-        offset = (page - 1) * page_size
-        rows = await self._query_all(
+        offset = 0 if after else (page - 1) * page_size
+        after_ts, after_id = after or (None, None)
+        return await self._query_dicts(
             """SELECT w.sec_user_id, w.aweme_id, w.desc, w.create_ts, w.create_date,
             w.cover, w.play_count, w.width, w.height, w.work_type,
             w.upload_status, w.upload_provider, w.upload_destination,
@@ -1472,17 +1840,18 @@ class Database:
             COALESCE(u.uid, '') AS uid
             FROM douyin_work w
             LEFT JOIN douyin_user u ON w.sec_user_id = u.sec_user_id
-            ORDER BY w.create_ts DESC
+            WHERE ? IS NULL OR (w.create_ts, w.aweme_id) < (?, ?)
+            ORDER BY w.create_ts DESC, w.aweme_id DESC
             LIMIT ? OFFSET ?;""",
-            (page_size, offset),
+            (after_ts, after_ts, after_id, page_size, offset),
         )
-        return [dict(i) for i in rows]
 
     async def count_douyin_live_today(self, date_str: str) -> int:
         row = await self._query_one(
             """SELECT COUNT(1) AS total FROM douyin_user
-            WHERE is_live=1 AND substr(last_live_at, 1, 10)=?;""",
-            (date_str,),
+            WHERE is_live=1
+              AND last_live_at >= ? AND last_live_at < date(?, '+1 day');""",
+            (date_str, date_str),
         )
         return int(row["total"]) if row else 0
 
@@ -1491,11 +1860,13 @@ class Database:
         date_str: str,
         page: int,
         page_size: int,
+        after: tuple[str, str] | None = None,
     ) -> list[dict]:
         page = max(page, 1)
         page_size = max(page_size, 1)
-        offset = (page - 1) * page_size
-        rows = await self._query_all(
+        offset = 0 if after else (page - 1) * page_size
+        after_live_at, after_id = after or (None, None)
+        return await self._query_dicts(
             """SELECT id, sec_user_id,
             COALESCE(uid, '') AS uid,
             COALESCE(nickname, '') AS nickname,
@@ -1504,12 +1875,21 @@ class Database:
             has_new_today, auto_update, update_window_start, update_window_end,
             last_live_at, last_new_at, last_fetch_at, created_at, updated_at
             FROM douyin_user
-            WHERE is_live=1 AND substr(last_live_at, 1, 10)=?
-            ORDER BY last_live_at DESC
+            WHERE is_live=1
+              AND last_live_at >= ? AND last_live_at < date(?, '+1 day')
+              AND (? IS NULL OR (last_live_at, sec_user_id) < (?, ?))
+            ORDER BY last_live_at DESC, sec_user_id DESC
             LIMIT ? OFFSET ?;""",
-            (date_str, page_size, offset),
+            (
+                date_str,
+                date_str,
+                after_live_at,
+                after_live_at,
+                after_id,
+                page_size,
+                offset,
+            ),
         )
-        return [dict(i) for i in rows]
 
     async def count_douyin_playlists(self) -> int:
         row = await self._query_one("SELECT COUNT(1) AS total FROM douyin_playlist;")
@@ -1519,67 +1899,72 @@ class Database:
         self,
         page: int,
         page_size: int,
+        after: tuple[str, int] | None = None,
     ) -> list[dict]:
         page = max(page, 1)
         page_size = min(max(page_size, 1), 100)
-        offset = (page - 1) * page_size
-        rows = await self._query_all(
-            """SELECT p.id, p.name, p.created_at, p.updated_at,
-            COUNT(pi.id) AS item_count
-            FROM douyin_playlist p
-            LEFT JOIN douyin_playlist_item pi ON pi.playlist_id = p.id
-            GROUP BY p.id
-            ORDER BY p.updated_at DESC, p.id DESC
+        offset = 0 if after else (page - 1) * page_size
+        after_updated_at, after_id = after or (None, None)
+        return await self._query_dicts(
+            """SELECT id, name, created_at, updated_at, item_count
+            FROM douyin_playlist
+            WHERE ? IS NULL OR (updated_at, id) < (?, ?)
+            ORDER BY updated_at DESC, id DESC
             LIMIT ? OFFSET ?;""",
-            (page_size, offset),
+            (
+                after_updated_at,
+                after_updated_at,
+                after_id,
+                page_size,
+                offset,
+            ),
         )
-        return [dict(i) for i in rows]
 
     async def get_douyin_playlist(self, playlist_id: int) -> dict:
         row = await self._query_one(
-            """SELECT p.id, p.name, p.created_at, p.updated_at,
-            COUNT(pi.id) AS item_count
-            FROM douyin_playlist p
-            LEFT JOIN douyin_playlist_item pi ON pi.playlist_id = p.id
-            WHERE p.id=?
-            GROUP BY p.id;""",
+            """SELECT id, name, created_at, updated_at, item_count
+            FROM douyin_playlist
+            WHERE id=?;""",
             (playlist_id,),
         )
         return dict(row) if row else {}
 
     async def create_douyin_playlist(self, name: str) -> dict:
         now = self._now_str()
-        cursor = await self.database.execute(
+        row = await self._execute_one(
             """INSERT INTO douyin_playlist (name, created_at, updated_at)
-            VALUES (?, ?, ?);""",
+            VALUES (?, ?, ?)
+            RETURNING id, name, created_at, updated_at, item_count;""",
             (name, now, now),
         )
-        await self.database.commit()
-        return await self.get_douyin_playlist(cursor.lastrowid)
+        return dict(row) if row else {}
 
     async def delete_douyin_playlist(self, playlist_id: int) -> None:
-        await self.database.execute(
-            "DELETE FROM douyin_playlist_item WHERE playlist_id=?;",
-            (playlist_id,),
-        )
-        await self.database.execute(
-            "DELETE FROM douyin_playlist WHERE id=?;",
-            (playlist_id,),
-        )
-        await self.database.commit()
+        async with self._transaction() as database:
+            await database.execute(
+                "DELETE FROM douyin_playlist_item WHERE playlist_id=?;",
+                (playlist_id,),
+            )
+            await database.execute(
+                "DELETE FROM douyin_playlist WHERE id=?;",
+                (playlist_id,),
+            )
 
     async def clear_douyin_playlist(self, playlist_id: int) -> int:
-        now = self._now_str()
-        cursor = await self.database.execute(
-            "DELETE FROM douyin_playlist_item WHERE playlist_id=?;",
-            (playlist_id,),
-        )
-        await self.database.execute(
-            "UPDATE douyin_playlist SET updated_at=? WHERE id=?;",
-            (now, playlist_id),
-        )
-        await self.database.commit()
-        return int(cursor.rowcount or 0)
+        async with self._transaction() as database:
+            cursor = await database.execute(
+                "DELETE FROM douyin_playlist_item WHERE playlist_id=?;",
+                (playlist_id,),
+            )
+            removed = int(cursor.rowcount or 0)
+            if removed:
+                now = self._now_str()
+                await database.execute(
+                    """UPDATE douyin_playlist SET item_count=0, updated_at=?
+                    WHERE id=?;""",
+                    (now, playlist_id),
+                )
+        return removed
 
     async def insert_douyin_playlist_items(
         self,
@@ -1589,25 +1974,23 @@ class Database:
         if not aweme_ids:
             return 0
         now = self._now_str()
-        inserted = 0
-        for aweme_id in aweme_ids:
-            if not aweme_id:
-                continue
-            cursor = await self.database.execute(
+        rows = [(playlist_id, aweme_id, now) for aweme_id in aweme_ids if aweme_id]
+        async with self._transaction() as database:
+            before = database.total_changes
+            await database.executemany(
                 """INSERT INTO douyin_playlist_item
                 (playlist_id, aweme_id, created_at)
                 VALUES (?, ?, ?)
                 ON CONFLICT(playlist_id, aweme_id) DO NOTHING;""",
-                (playlist_id, aweme_id, now),
+                rows,
             )
-            if cursor.rowcount and cursor.rowcount > 0:
-                inserted += 1
-        if inserted:
-            await self.database.execute(
-                "UPDATE douyin_playlist SET updated_at=? WHERE id=?;",
-                (now, playlist_id),
-            )
-        await self.database.commit()
+            if inserted := database.total_changes - before:
+                await database.execute(
+                    """UPDATE douyin_playlist
+                    SET item_count=item_count + ?, updated_at=?
+                    WHERE id=?;""",
+                    (inserted, now, playlist_id),
+                )
         return inserted
 
     async def count_douyin_playlist_items(self, playlist_id: int) -> int:
@@ -1624,11 +2007,13 @@ class Database:
         playlist_id: int,
         page: int,
         page_size: int,
+        after: tuple[str, int] | None = None,
     ) -> list[dict]:
         page = max(page, 1)
         page_size = min(max(page_size, 1), 100)
-        offset = (page - 1) * page_size
-        rows = await self._query_all(
+        offset = 0 if after else (page - 1) * page_size
+        after_created_at, after_id = after or (None, None)
+        return await self._query_dicts(
             """SELECT w.sec_user_id, w.aweme_id, w.desc, w.create_ts, w.create_date,
             w.cover, w.play_count, w.width, w.height, w.work_type,
             w.upload_status, w.upload_provider, w.upload_destination,
@@ -1636,16 +2021,25 @@ class Database:
             w.downloaded_at, w.uploaded_at,
             COALESCE(u.nickname, '') AS nickname,
             COALESCE(u.avatar, '') AS avatar,
-            COALESCE(u.uid, '') AS uid
+            COALESCE(u.uid, '') AS uid,
+            pi.created_at AS item_created_at,
+            pi.id AS item_id
             FROM douyin_playlist_item pi
             JOIN douyin_work w ON w.aweme_id = pi.aweme_id
             LEFT JOIN douyin_user u ON w.sec_user_id = u.sec_user_id
             WHERE pi.playlist_id=?
-            ORDER BY pi.created_at DESC
+              AND (? IS NULL OR (pi.created_at, pi.id) < (?, ?))
+            ORDER BY pi.created_at DESC, pi.id DESC
             LIMIT ? OFFSET ?;""",
-            (playlist_id, page_size, offset),
+            (
+                playlist_id,
+                after_created_at,
+                after_created_at,
+                after_id,
+                page_size,
+                offset,
+            ),
         )
-        return [dict(i) for i in rows]
 
     async def list_douyin_playlist_item_ids(
         self,
@@ -1654,12 +2048,12 @@ class Database:
     ) -> list[str]:
         if not aweme_ids:
             return []
-        placeholders = ",".join(["?"] * len(aweme_ids))
         rows = await self._query_all(
-            f"""SELECT aweme_id
+            """SELECT aweme_id
             FROM douyin_playlist_item
-            WHERE playlist_id=? AND aweme_id IN ({placeholders});""",
-            (playlist_id, *aweme_ids),
+            WHERE playlist_id=?
+              AND aweme_id IN (SELECT value FROM json_each(?));""",
+            (playlist_id, dumps(list(aweme_ids))),
         )
         return [row["aweme_id"] for row in rows]
 
@@ -1670,103 +2064,96 @@ class Database:
     ) -> int:
         if not aweme_ids:
             return 0
-        placeholders = ",".join(["?"] * len(aweme_ids))
-        cursor = await self.database.execute(
-            f"""DELETE FROM douyin_playlist_item
-            WHERE playlist_id=? AND aweme_id IN ({placeholders});""",
-            (playlist_id, *aweme_ids),
-        )
-        removed = int(cursor.rowcount or 0)
-        if removed:
-            now = self._now_str()
-            await self.database.execute(
-                "UPDATE douyin_playlist SET updated_at=? WHERE id=?;",
-                (now, playlist_id),
+        async with self._transaction() as database:
+            cursor = await database.execute(
+                """DELETE FROM douyin_playlist_item
+                WHERE playlist_id=?
+                  AND aweme_id IN (SELECT value FROM json_each(?));""",
+                (playlist_id, dumps(list(aweme_ids))),
             )
-        await self.database.commit()
+            removed = int(cursor.rowcount or 0)
+            if removed:
+                now = self._now_str()
+                await database.execute(
+                    """UPDATE douyin_playlist
+                    SET item_count=MAX(item_count - ?, 0), updated_at=?
+                    WHERE id=?;""",
+                    (removed, now, playlist_id),
+                )
         return removed
 
     async def get_douyin_schedule(self) -> dict:
-        row = await self._query_one(
-            """SELECT id, enabled, times_text, updated_at
-            FROM douyin_schedule WHERE id=1;"""
-        )
-        return dict(row) if row else {}
+        if self.__schedule is None:
+            version = self.__schedule_version
+            row = await self._query_one(_SQL_GET_SCHEDULE)
+            if version != self.__schedule_version:
+                return dict(row) if row else {}
+            self.__schedule = dict(row) if row else {}
+        return self.__schedule.copy()
 
     async def upsert_douyin_schedule(
         self,
         enabled: bool,
         times_text: str,
+        *,
+        return_row: bool = True,
     ) -> dict:
         now = self._now_str()
-        await self.database.execute(
-            """INSERT INTO douyin_schedule (
-            id, enabled, times_text, updated_at
-            ) VALUES (1, ?, ?, ?)
-            ON CONFLICT(id) DO UPDATE SET
-                enabled=excluded.enabled,
-                times_text=excluded.times_text,
-                updated_at=excluded.updated_at;""",
+        await self._execute(
+            _SQL_UPSERT_SCHEDULE,
             (
                 1 if enabled else 0,
                 times_text or "",
                 now,
             ),
         )
-        await self.database.commit()
+        self.__schedule = None
+        self.__schedule_version += 1
+        if not return_row:
+            return {}
         return await self.get_douyin_schedule()
 
     async def list_douyin_cookies(
         self,
         status: str | None = None,
     ) -> list[dict]:
-        if status:
-            rows = await self._query_all(
-                """SELECT id, account, cookie, cookie_hash, status, fail_count,
-                last_used_at, last_failed_at, created_at, updated_at
-                FROM douyin_cookie
-                WHERE status=?
-                ORDER BY updated_at DESC;""",
-                (status,),
-            )
-        else:
-            rows = await self._query_all(
-                """SELECT id, account, cookie, cookie_hash, status, fail_count,
-                last_used_at, last_failed_at, created_at, updated_at
-                FROM douyin_cookie
-                ORDER BY updated_at DESC;"""
-            )
-        return [dict(i) for i in rows]
+        status = status or None
+        if (rows := self.__cookies.get(status)) is None:
+            version = self.__cookies_version
+            rows = await self._query_dicts(_SQL_LIST_COOKIES, {"status": status})
+            if version != self.__cookies_version:
+                return rows
+            self.__cookies[status] = rows
+        return [i.copy() for i in rows]
+
+    def __invalidate_cookies(self):
+        self.__cookies.clear()
+        self.__cookies_version += 1
 
     async def upsert_douyin_cookie(
         self,
         account: str,
         cookie: str,
         cookie_hash: str,
+        *,
+        return_row: bool = True,
     ) -> dict:
+        existing = await self._query_one(_SQL_GET_COOKIE_BY_HASH, (cookie_hash,))
+        if (
+            existing
+            and existing["cookie"] == cookie
+            and existing["account"] == account
+            and existing["status"] == "active"
+            and not existing["fail_count"]
+        ):
+            return dict(existing) if return_row else {}
         now = self._now_str()
-        await self.database.execute(
-            """INSERT INTO douyin_cookie (
-                account, cookie, cookie_hash, status, fail_count,
-                last_used_at, last_failed_at, created_at, updated_at
-            ) VALUES (?, ?, ?, 'active', 0, '', '', ?, ?)
-            ON CONFLICT(cookie_hash) DO UPDATE SET
-                account=excluded.account,
-                cookie=excluded.cookie,
-                status='active',
-                fail_count=0,
-                updated_at=excluded.updated_at;""",
+        row = await self._execute_one(
+            _SQL_UPSERT_COOKIE,
             (account, cookie, cookie_hash, now, now),
         )
-        await self.database.commit()
-        row = await self._query_one(
-            """SELECT id, account, cookie, cookie_hash, status, fail_count,
-            last_used_at, last_failed_at, created_at, updated_at
-            FROM douyin_cookie
-            WHERE cookie_hash=?;""",
-            (cookie_hash,),
-        )
-        return dict(row) if row else {}
+        self.__invalidate_cookies()
+        return dict(row) if row and return_row else {}
 
     async def update_douyin_cookie(
         self,
@@ -1774,18 +2161,12 @@ class Database:
         account: str,
         cookie: str,
         cookie_hash: str,
+        *,
+        return_row: bool = True,
     ) -> dict:
         now = self._now_str()
-        await self.database.execute(
-            """UPDATE douyin_cookie
-            SET account=?,
-                cookie=?,
-                cookie_hash=?,
-                status='active',
-                fail_count=0,
-                last_failed_at='',
-                updated_at=?
-            WHERE id=?;""",
+        row = await self._execute_one(
+            _SQL_UPDATE_COOKIE,
             (
                 account,
                 cookie,
@@ -1794,43 +2175,46 @@ class Database:
                 cookie_id,
             ),
         )
-        await self.database.commit()
-        row = await self._query_one(
-            """SELECT id, account, cookie, cookie_hash, status, fail_count,
-            last_used_at, last_failed_at, created_at, updated_at
-            FROM douyin_cookie
-            WHERE id=?;""",
-            (cookie_id,),
-        )
-        return dict(row) if row else {}
+        self.__invalidate_cookies()
+        return dict(row) if row and return_row else {}
 
     async def mark_douyin_cookie_expired(self, cookie_id: int) -> None:
         now = self._now_str()
-        await self.database.execute(
-            """UPDATE douyin_cookie
-            SET status='expired',
-                fail_count=fail_count + 1,
-                last_failed_at=?,
-                updated_at=?
-            WHERE id=?;""",
-            (now, now, cookie_id),
-        )
-        await self.database.commit()
+        await self._execute(_SQL_MARK_COOKIE_EXPIRED, (now, now, cookie_id))
+        self.__invalidate_cookies()
 
-    async def touch_douyin_cookie(self, cookie_id: int) -> None:
+    async def mark_douyin_cookies_expired(self, cookie_ids: list[int]) -> None:
+        if not cookie_ids:
+            return
         now = self._now_str()
-        await self.database.execute(
-            """UPDATE douyin_cookie
-            SET last_used_at=?,
-                updated_at=?
-            WHERE id=?;""",
-            (now, now, cookie_id),
-        )
-        await self.database.commit()
+        async with self._transaction() as database:
+            await database.executemany(
+                _SQL_MARK_COOKIE_EXPIRED,
+                [(now, now, i) for i in cookie_ids],
+            )
+        self.__invalidate_cookies()
+
+    async def touch_douyin_cookie(self, cookie_id: int) -> None:
+        now = self.__touched[cookie_id] = self._now_str()
+        self._mark_dirty()
+        for rows in self.__cookies.values():
+            for index, item in enumerate(rows):
+                if item["id"] == cookie_id:
+                    item["last_used_at"] = item["updated_at"] = now
+                    rows.insert(0, rows.pop(index))
+                    break
 
     async def delete_douyin_cookie(self, cookie_id: int) -> None:
-        await self.database.execute(
-            "DELETE FROM douyin_cookie WHERE id=?;",
-            (cookie_id,),
-        )
-        await self.database.commit()
+        async with self._transaction() as database:
+            await database.execute(_SQL_DELETE_COOKIE, (cookie_id,))
+        self.__invalidate_cookies()
+
+    async def delete_douyin_cookies(self, cookie_ids: list[int]) -> None:
+        if not cookie_ids:
+            return
+        async with self._transaction() as database:
+            await database.executemany(
+                _SQL_DELETE_COOKIE,
+                [(i,) for i in cookie_ids],
+            )
+        self.__invalidate_cookies()
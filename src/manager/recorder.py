@@ -157,18 +157,22 @@ class UploadRecorder:
     def __init__(self, database: "Database"):
         self.database = database
 
-    async def has_upload(
+    async def get_upload_hash(
         self,
-        file_hash: str,
         provider: str,
         destination: str,
-    ) -> bool:
-        if not all((file_hash, provider, destination)):
-            return False
-        return await self.database.has_upload_data(
-            file_hash=file_hash,
+        local_path: str,
+        local_size: int,
+        local_mtime: int,
+    ) -> str:
+        if not all((provider, destination, local_path)):
+            return ""
+        return await self.database.get_upload_hash(
             provider=provider,
             destination=destination,
+            local_path=local_path,
+            local_size=local_size,
+            local_mtime=local_mtime,
         )
 
     async def update_upload(
@@ -180,6 +184,7 @@ class UploadRecorder:
         local_path: str,
         local_size: int,
         work_id: str = "",
+        local_mtime: int = 0,
     ) -> None:
         if not all((file_hash, provider, destination)):
             return
@@ -191,6 +196,7 @@ class UploadRecorder:
             local_path=local_path,
             local_size=local_size,
             work_id=work_id,
+            local_mtime=local_mtime,
         )
         if work_id:
             await self.database.update_douyin_work_upload(
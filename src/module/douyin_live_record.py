@@ -1,22 +1,26 @@
 from asyncio import (
-    FIRST_COMPLETED,
     Event,
     create_subprocess_exec,
     create_task,
+    gather,
     sleep,
     to_thread,
-    wait,
+    wait_for,
 )
 from asyncio.subprocess import DEVNULL, PIPE
 from contextlib import suppress
 from dataclasses import dataclass, field
 from datetime import datetime
+from os import scandir, unlink
 from pathlib import Path
-from re import sub
+from random import uniform
+from re import compile
 from shutil import which
 from typing import TYPE_CHECKING
 from unicodedata import normalize
 
+from aiofiles import open
+
 from ..uploader import UploadOutcome, UploadService
 
 if TYPE_CHECKING:
@@ -47,13 +51,21 @@ class _LiveSession:
     task: object | None = None
     process: object | None = None
     retry_count: int = 0
+    failure_count: int = 0
+    command: list[str] = field(default_factory=list)
 
 
 class DouyinLiveRecorder:
     MONITOR_INTERVAL = 30
     SEGMENT_SECONDS = 30
     OFFLINE_THRESHOLD = 3
+    STALL_TIMEOUT = 60
+    MAX_RETRIES = 20
+    RETRY_DELAY_MAX = 30
+    RETRY_PERSIST_EVERY = 5
     SAVE_FOLDER = "LiveRecord"
+    WHITESPACE = compile(r"\s+")
+    UNSAFE_TEXT = compile(r"[^\w\u4e00-\u9fff-]+")
 
     def __init__(
         self,
@@ -76,31 +88,29 @@ class DouyinLiveRecorder:
         self.monitor_interval = self.MONITOR_INTERVAL
         self.segment_seconds = self.SEGMENT_SECONDS
         self.offline_threshold = self.OFFLINE_THRESHOLD
+        self.stall_timeout = self.STALL_TIMEOUT
+        self.max_retries = self.MAX_RETRIES
+        self.retry_delay_max = self.RETRY_DELAY_MAX
+        self.retry_persist_every = self.RETRY_PERSIST_EVERY
         self.save_folder = self.SAVE_FOLDER
         if not self.ffmpeg_path:
             self.log.warning("未检测到 ffmpeg，直播录制功能自动禁用")
 
-    @staticmethod
-    def _safe_text(value: str, default: str) -> str:
+    @classmethod
+    def _safe_text(cls, value: str, default: str) -> str:
         text = normalize("NFKC", str(value or ""))
-        text = sub(r"\s+", "", text)
-        text = sub(r"[^\w\u4e00-\u9fff-]+", "", text).strip("._-")
+        text = cls.WHITESPACE.sub("", text)
+        text = cls.UNSAFE_TEXT.sub("", text).strip("._-")
         return text[:80] or default
 
     @staticmethod
     def _pick_stream_url(room: dict) -> str:
-        if not isinstance(room, dict):
-            return ""
-        hls_map = room.get("hls_pull_url_map") or {}
-        if isinstance(hls_map, dict):
-            for value in hls_map.values():
-                if value:
-                    return str(value)
-        flv_map = room.get("flv_pull_url") or {}
-        if isinstance(flv_map, dict):
-            for value in flv_map.values():
-                if value:
-                    return str(value)
+        for key in ("hls_pull_url_map", "flv_pull_url"):
+            urls = room.get(key)
+            if isinstance(urls, dict) and (
+                value := next(filter(None, urls.values()), None)
+            ):
+                return str(value)
         return ""
 
     def _build_session(self, sec_user_id: str, live_info: dict) -> _LiveSession | None:
@@ -118,11 +128,12 @@ class DouyinLiveRecorder:
         nickname = self._safe_text(room.get("nickname", ""), sec_user_id)
         title = self._safe_text(room.get("title", ""), "直播")
         date_mark = now.strftime("%Y-%m-%d_%H-%M-%S")
+        stamp = now.strftime("%Y%m%d_%H%M%S")
         file_title = self._safe_text(f"直播-{title}-{date_mark}", f"直播-{date_mark}")
 
-        local_root = self.root.joinpath(self.save_folder, nickname, f"{now:%Y}")
+        local_root = self.root.joinpath(self.save_folder, nickname, stamp[:4]).resolve()
         local_root.mkdir(parents=True, exist_ok=True)
-        segment_dir = local_root.joinpath(f".segments_{sec_user_id}_{now:%Y%m%d_%H%M%S}")
+        segment_dir = local_root.joinpath(f".segments_{sec_user_id}_{stamp}")
         segment_dir.mkdir(parents=True, exist_ok=True)
         output_file = local_root.joinpath(f"{file_title}.mp4")
         cover_file = local_root.joinpath(f"{file_title}.jpeg")
@@ -165,9 +176,9 @@ class DouyinLiveRecorder:
             nickname=session.nickname,
             title=session.title,
             stream_url=session.stream_url,
-            local_root=str(session.local_root.resolve()),
-            segment_dir=str(session.segment_dir.resolve()),
-            output_file=str(session.output_file.resolve()),
+            local_root=str(session.local_root),
+            segment_dir=str(session.segment_dir),
+            output_file=str(session.output_file),
         )
 
         session.task = create_task(self._record_loop(session))
@@ -203,23 +214,40 @@ class DouyinLiveRecorder:
             if session.task:
                 with suppress(Exception):
                     await session.task
+        await self.uploader.close()
+
+    @staticmethod
+    def _list_segments(segment_dir: Path) -> list[str]:
+        with scandir(segment_dir) as entries:
+            return sorted(
+                i.name for i in entries if i.name.endswith(".ts") and i.is_file()
+            )
 
     def _next_segment_number(self, segment_dir: Path) -> int:
-        numbers = []
-        for file in segment_dir.glob("*.ts"):
-            try:
-                numbers.append(int(file.stem))
-            except ValueError:
-                continue
-        return max(numbers, default=-1) + 1
+        with scandir(segment_dir) as entries:
+            return 1 + max(
+                (
+                    int(i.name[:-3])
+                    for i in entries
+                    if i.name.endswith(".ts") and i.name[:-3].isdecimal()
+                ),
+                default=-1,
+            )
 
     def _build_record_command(self, session: _LiveSession) -> list[str]:
+        start_number = str(self._next_segment_number(session.segment_dir))
+        if session.command:
+            session.command[-2] = start_number
+            return session.command
         output_pattern = str(session.segment_dir.joinpath("%08d.ts"))
         command = [
             self.ffmpeg_path,
             "-hide_banner",
             "-loglevel",
-            "warning",
+            "error",
+            "-nostats",
+            "-progress",
+            "pipe:1",
             "-rw_timeout",
             str(30 * 1000 * 1000),
             "-reconnect",
@@ -254,45 +282,55 @@ class DouyinLiveRecorder:
                 "-reset_timestamps",
                 "1",
                 "-segment_start_number",
-                str(self._next_segment_number(session.segment_dir)),
+                start_number,
                 output_pattern,
             ]
         )
+        session.command = command
         return command
 
     async def _run_record_once(self, session: _LiveSession) -> int:
         command = self._build_record_command(session)
         process = await create_subprocess_exec(
             *command,
-            stdout=DEVNULL,
+            stdout=PIPE,
             stderr=DEVNULL,
         )
         session.process = process
 
-        wait_task = create_task(process.wait())
-        stop_task = create_task(session.stop_event.wait())
-        done, pending = await wait(
-            {wait_task, stop_task},
-            return_when=FIRST_COMPLETED,
-        )
-
-        if stop_task in done and process.returncode is None:
-            process.terminate()
-            with suppress(Exception):
-                await process.wait()
+        def terminate(task) -> None:
+            if task.cancelled() or process.returncode is not None:
+                return
+            with suppress(ProcessLookupError):
+                process.terminate()
 
-        for task in pending:
-            task.cancel()
-            with suppress(Exception):
-                await task
+        stop_task = create_task(session.stop_event.wait())
+        stop_task.add_done_callback(terminate)
+        progress_task = create_task(self._watch_progress(session, process))
+        try:
+            return_code = await process.wait()
+        finally:
+            stop_task.cancel()
+            progress_task.cancel()
+            session.process = None
+        return int(return_code or 0)
 
-        if wait_task in done:
-            return_code = wait_task.result()
-        else:
-            return_code = process.returncode if process.returncode is not None else 0
+    def _retry_delay(self, retry_count: int) -> float:
+        return min(1.5**retry_count, self.retry_delay_max) + uniform(0, 1)
 
-        session.process = None
-        return int(return_code or 0)
+    async def _watch_progress(self, session: _LiveSession, process) -> None:
+        while True:
+            try:
+                line = await wait_for(process.stdout.readline(), self.stall_timeout)
+            except TimeoutError:
+                self.log.warning(
+                    f"直播录制长时间无进度，准备重连: sec_user_id={session.sec_user_id}"
+                )
+                with suppress(ProcessLookupError):
+                    process.terminate()
+                return
+            if not line:
+                return
 
     async def _record_loop(self, session: _LiveSession) -> None:
         error = ""
@@ -309,27 +347,41 @@ class DouyinLiveRecorder:
                 if session.stop_event.is_set():
                     break
                 session.retry_count += 1
+                # 本轮写出了新分段视为有效录制，仅连续无产出的失败计入上限
+                if self._next_segment_number(session.segment_dir) > int(
+                    session.command[-2]
+                ):
+                    session.failure_count = 0
+                else:
+                    session.failure_count += 1
                 error = f"ffmpeg exited with code {return_code}"
-                await self.database.update_douyin_live_record_retry(
-                    session.record_id,
-                    session.retry_count,
-                    error,
-                )
-                await sleep(min(3 * session.retry_count, 15))
+                if session.retry_count % self.retry_persist_every == 1:
+                    await self.database.update_douyin_live_record_retry(
+                        session.record_id,
+                        session.retry_count,
+                        error,
+                    )
+                if session.failure_count >= self.max_retries:
+                    self.log.warning(
+                        f"直播录制重试次数已达上限: sec_user_id={session.sec_user_id}"
+                    )
+                    break
+                await sleep(self._retry_delay(session.failure_count))
 
             merged = await self._merge_segments(session)
-            self._cleanup_segment_dir(session)
             if merged:
-                output_path = str(session.output_file.resolve())
-                await self._download_cover(session)
-                width, height = await self._probe_output_size(session.output_file)
+                output_path = str(session.output_file)
+                _, _, (width, height) = await gather(
+                    to_thread(self._cleanup_segment_dir, session),
+                    self._download_cover(session),
+                    self._probe_output_size(session.output_file),
+                )
                 if not width or not height:
                     width, height = session.width, session.height
                 upload_outcome = await self._upload_record_file(session)
                 if upload_outcome.success:
                     status = "uploaded"
                     error = ""
-                    await self.database.mark_douyin_live_record_uploaded(session.record_id)
                 elif upload_outcome.attempted:
                     status = "upload_failed"
                     error = upload_outcome.reason or "直播上传失败"
@@ -368,6 +420,7 @@ class DouyinLiveRecorder:
                     self._cleanup_output_file(session.output_file)
                     self._cleanup_output_file(session.cover_file)
             else:
+                await to_thread(self._cleanup_segment_dir, session)
                 status = "failed"
                 error = "直播分段合并失败或无可用分段"
             await self.database.finish_douyin_live_record(
@@ -378,6 +431,8 @@ class DouyinLiveRecorder:
                 upload_origin_destination=upload_outcome.origin_destination,
                 work_aweme_id=work_aweme_id,
                 error=error,
+                retry_count=session.retry_count,
+                uploaded=upload_outcome.success,
             )
         except Exception as exc:
             await self.database.finish_douyin_live_record(
@@ -388,6 +443,8 @@ class DouyinLiveRecorder:
                 upload_origin_destination=upload_outcome.origin_destination,
                 work_aweme_id=work_aweme_id,
                 error=repr(exc),
+                retry_count=session.retry_count,
+                uploaded=upload_outcome.success,
             )
             self.log.error(
                 f"直播录制任务异常: sec_user_id={session.sec_user_id}, error={repr(exc)}"
@@ -396,29 +453,34 @@ class DouyinLiveRecorder:
             self.sessions.pop(session.sec_user_id, None)
             self.offline_hits.pop(session.sec_user_id, None)
 
-    async def _merge_segments(self, session: _LiveSession) -> bool:
-        segments = sorted(session.segment_dir.glob("*.ts"))
+    @classmethod
+    def _prepare_merge_source(cls, session: _LiveSession) -> list[str]:
+        segments = cls._list_segments(session.segment_dir)
         if not segments:
-            return False
+            return []
 
-        if session.output_file.exists():
+        with suppress(FileNotFoundError):
             session.output_file.unlink()
 
+        if len(segments) == 1:
+            return ["-i", str(session.segment_dir.joinpath(segments[0]))]
         filelist = session.segment_dir.joinpath("filelist.txt")
-        lines = [f"file '{str(i.resolve())}'" for i in segments]
-        filelist.write_text("\n".join(lines), encoding="utf-8")
+        with filelist.open("w", encoding="utf-8", buffering=1 << 16) as file:
+            for name in segments:
+                file.write(f"file '{name}'\n")
+        return ["-f", "concat", "-safe", "0", "-i", str(filelist)]
+
+    async def _merge_segments(self, session: _LiveSession) -> bool:
+        source = await to_thread(self._prepare_merge_source, session)
+        if not source:
+            return False
 
         command = [
             self.ffmpeg_path,
             "-hide_banner",
             "-loglevel",
             "warning",
-            "-f",
-            "concat",
-            "-safe",
-            "0",
-            "-i",
-            str(filelist),
+            *source,
             "-c",
             "copy",
             str(session.output_file),
@@ -429,30 +491,7 @@ class DouyinLiveRecorder:
             stderr=DEVNULL,
         )
         return_code = await process.wait()
-
-        if return_code == 0 and session.output_file.is_file():
-            return True
-
-        if len(segments) == 1:
-            single = [
-                self.ffmpeg_path,
-                "-hide_banner",
-                "-loglevel",
-                "warning",
-                "-i",
-                str(segments[0]),
-                "-c",
-                "copy",
-                str(session.output_file),
-            ]
-            process = await create_subprocess_exec(
-                *single,
-                stdout=DEVNULL,
-                stderr=DEVNULL,
-            )
-            return_code = await process.wait()
-            return return_code == 0 and session.output_file.is_file()
-        return False
+        return return_code == 0 and session.output_file.is_file()
 
     @staticmethod
     def _build_live_work_id(session: _LiveSession) -> str:
@@ -488,12 +527,13 @@ class DouyinLiveRecorder:
             process = await create_subprocess_exec(
                 *command,
                 stdout=PIPE,
-                stderr=PIPE,
+                stderr=DEVNULL,
             )
         except OSError:
             return 0, 0
         try:
-            stdout, _ = await process.communicate()
+            stdout = await process.stdout.read()
+            await process.wait()
         except Exception:
             return 0, 0
         text = stdout.decode("utf-8", errors="ignore").strip()
@@ -517,12 +557,11 @@ class DouyinLiveRecorder:
 
     @staticmethod
     def _cleanup_segment_dir(session: _LiveSession) -> None:
-        if not session.segment_dir.exists():
-            return
-        for child in session.segment_dir.iterdir():
-            with suppress(OSError):
-                if child.is_file():
-                    child.unlink()
+        with suppress(FileNotFoundError), scandir(session.segment_dir) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    with suppress(OSError):
+                        unlink(entry.path)
         with suppress(OSError):
             session.segment_dir.rmdir()
 
@@ -532,19 +571,19 @@ class DouyinLiveRecorder:
         if session.cover_file.exists():
             return
         try:
-            response = await self.params.client.get(
+            async with self.params.client.stream(
+                "GET",
                 session.cover_url,
                 follow_redirects=True,
-            )
-            response.raise_for_status()
-            content = bytes(response.content or b"")
-            if not content:
-                return
-            await to_thread(
-                session.cover_file.write_bytes,
-                content,
-            )
+            ) as response:
+                response.raise_for_status()
+                async with open(session.cover_file, "wb") as file:
+                    async for chunk in response.aiter_bytes(self.params.chunk):
+                        await file.write(chunk)
+            if not session.cover_file.stat().st_size:
+                self._cleanup_output_file(session.cover_file)
         except Exception as exc:
+            self._cleanup_output_file(session.cover_file)
             self.log.warning(
                 f"下载直播封面失败: sec_user_id={session.sec_user_id}, {repr(exc)}"
             )
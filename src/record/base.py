@@ -1,4 +1,5 @@
 from pathlib import Path
+from sys import exception
 from time import localtime, strftime
 import traceback
 from typing import TYPE_CHECKING
@@ -21,6 +22,7 @@ class BaseLogger:
     """不记录日志，空白日志记录器"""
 
     DEBUG = VERSION_BETA
+    CLEANER = Cleaner()
 
     def __init__(
         self,
@@ -73,9 +75,9 @@ class BaseLogger:
             )
             return "%Y-%m-%d %H.%M.%S"
 
-    @staticmethod
-    def check_folder(folder: str) -> str:
-        return Cleaner().filter_name(folder, "Log")
+    @classmethod
+    def check_folder(cls, folder: str) -> str:
+        return cls.CLEANER.filter_name(folder, "Log")
 
     def run(self, *args, **kwargs):
         pass
@@ -102,10 +104,8 @@ class BaseLogger:
     def error(self, text: str, output=True, **kwargs):
         if output:
             options, exc_info = self._normalize_console_kwargs(kwargs)
-            if exc_info:
-                trace = traceback.format_exc()
-                if trace and trace.strip() and trace.strip() != "NoneType: None":
-                    text = f"{text}\n{trace}"
+            if exc_info and (error := exception()) is not None:
+                text = f"{text}\n{''.join(traceback.format_exception(error))}"
             self.console.print(text, style=ERROR, **options)
 
     def debug(self, text: str, **kwargs):
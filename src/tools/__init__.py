@@ -1,3 +1,4 @@
+from .bloom import BloomFilter
 from .browser import Browser
 from .capture import capture_error_params
 from .capture import capture_error_request
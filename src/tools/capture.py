@@ -1,3 +1,4 @@
+from functools import wraps
 from json.decoder import JSONDecodeError
 from ssl import SSLError
 from typing import TYPE_CHECKING, Union
@@ -16,6 +17,7 @@ __all__ = [
 
 
 def capture_error_params(function):
+    @wraps(function)
     async def inner(logger: Union["BaseLogger", "LoggerManager"], *args, **kwargs):
         try:
             return await function(logger, *args, **kwargs)
@@ -41,6 +43,7 @@ def capture_error_params(function):
 
 
 def capture_error_request(function):
+    @wraps(function)
     async def inner(self, *args, **kwargs):
         try:
             return await function(self, *args, **kwargs)
@@ -1,10 +1,11 @@
-from asyncio import to_thread
-from copy import deepcopy
+from asyncio import Semaphore, create_task, gather, to_thread
 from dataclasses import dataclass
 from datetime import datetime
-from hashlib import sha256
+from hashlib import file_digest, sha256
 from pathlib import Path
-from re import search, sub
+from os import stat_result
+from re import compile
+from stat import S_ISREG
 from typing import TYPE_CHECKING, Callable
 from unicodedata import normalize
 
@@ -28,6 +29,15 @@ class UploadOutcome:
 
 
 class UploadService:
+    WHITESPACE = compile(r"\s+")
+    UNSAFE_TEXT = compile(r"[^\w\u4e00-\u9fff-]+")
+    UNSAFE_ASCII = dict.fromkeys(
+        i for i in range(128) if not (chr(i).isalnum() or chr(i) in "_-")
+    )
+    DATE = compile(
+        r"(\d{4})([-/.])(\d{1,2})\2(\d{1,2})(?: \d{1,2}:\d{1,2}:\d{1,2})?"
+    )
+    LOOSE_DATE = compile(r"(20\d{2})\D?([01]?\d)\D?([0-3]?\d)")
     DEFAULT_CONFIG = {
         "enabled": False,
         "delete_local_after_upload": False,
@@ -41,6 +51,7 @@ class UploadService:
             "remote_root": "/DouK-Downloader",
             "timeout": 30,
             "verify_ssl": True,
+            "verify_size": False,
         },
     }
 
@@ -86,9 +97,10 @@ class UploadService:
         return default
 
     def _normalize_config(self, config: dict | None) -> dict:
-        merged = deepcopy(self.DEFAULT_CONFIG)
-        if isinstance(config, dict):
-            merged = self._merge_dict(merged, config)
+        merged = self._merge_dict(
+            self.DEFAULT_CONFIG,
+            config if isinstance(config, dict) else {},
+        )
         merged["enabled"] = self._parse_config_bool(
             merged.get("enabled", False),
             default=False,
@@ -120,6 +132,10 @@ class UploadService:
             merged["webdav"].get("verify_ssl", True),
             default=True,
         )
+        merged["webdav"]["verify_size"] = self._parse_config_bool(
+            merged["webdav"].get("verify_size", False),
+            default=False,
+        )
         merged["webdav"]["base_url"] = str(merged["webdav"].get("base_url", "")).strip()
         merged["webdav"]["origin_base_url"] = str(
             merged["webdav"].get("origin_base_url", "")
@@ -159,9 +175,12 @@ class UploadService:
         except OSError as exc:
             self.log.warning(f"删除本地文件失败: {path}, {repr(exc)}")
 
+    async def close(self) -> None:
+        await self.webdav.aclose()
+
     @staticmethod
     def _merge_dict(base: dict, patch: dict) -> dict:
-        result = deepcopy(base)
+        result = dict(base)
         for key, value in patch.items():
             if isinstance(value, dict) and isinstance(result.get(key), dict):
                 result[key] = UploadService._merge_dict(result[key], value)
@@ -196,33 +215,30 @@ class UploadService:
             return {}
         return metadata if isinstance(metadata, dict) else {}
 
-    @staticmethod
-    def _sanitize_text(value: str, default: str) -> str:
-        text = normalize("NFKC", str(value or ""))
-        text = sub(r"\s+", "", text)
-        text = sub(r"[^\w\u4e00-\u9fff-]+", "", text).strip("._-")
+    @classmethod
+    def _sanitize_text(cls, value: str, default: str) -> str:
+        text = str(value or "")
+        if text.isascii():
+            return text.translate(cls.UNSAFE_ASCII).strip("._-")[:80] or default
+        text = normalize("NFKC", text)
+        text = cls.WHITESPACE.sub("", text)
+        text = cls.UNSAFE_TEXT.sub("", text).strip("._-")
         return text[:80] or default
 
-    @staticmethod
-    def _extract_publish_date(value: str | int | float) -> tuple[str, str]:
+    @classmethod
+    def _extract_publish_date(cls, value: str | int | float) -> tuple[str, str]:
         if isinstance(value, (int, float)) and value > 0:
             dt = datetime.fromtimestamp(value)
             return f"{dt:%Y}", f"{dt:%Y-%m-%d}"
         text = str(value or "").strip()
-        for fmt in (
-            "%Y-%m-%d %H:%M:%S",
-            "%Y-%m-%d",
-            "%Y/%m/%d %H:%M:%S",
-            "%Y/%m/%d",
-            "%Y.%m.%d %H:%M:%S",
-            "%Y.%m.%d",
-        ):
+        if m := cls.DATE.fullmatch(text):
+            year, month, day = m.group(1, 3, 4)
             try:
-                dt = datetime.strptime(text, fmt)
+                dt = datetime(int(year), int(month), int(day))
                 return f"{dt:%Y}", f"{dt:%Y-%m-%d}"
             except ValueError:
-                continue
-        if m := search(r"(20\d{2})\D?([01]?\d)\D?([0-3]?\d)", text):
+                pass
+        if m := cls.LOOSE_DATE.search(text):
             year, month, day = m.groups()
             return year, f"{int(year):04d}-{int(month):02d}-{int(day):02d}"
         return "UnknownYear", "UnknownDate"
@@ -267,6 +283,19 @@ class UploadService:
             remote_relative_path=None,
         )
 
+    async def upload_many(
+        self,
+        items: list[dict],
+        concurrency: int = 4,
+    ) -> list[UploadOutcome]:
+        semaphore = Semaphore(max(int(concurrency or 0), 1))
+
+        async def upload(item: dict) -> UploadOutcome:
+            async with semaphore:
+                return await self.upload_file_with_target(**item)
+
+        return await gather(*(upload(i) for i in items))
+
     async def upload_file_with_target(
         self,
         file_path: Path,
@@ -280,7 +309,11 @@ class UploadService:
                 success=False,
                 reason="上传未启用或后缀不匹配",
             )
-        if not file_path.is_file():
+        try:
+            stat, local_path = await to_thread(self._stat_sync, file_path)
+        except OSError:
+            stat = None
+        if not stat or not S_ISREG(stat.st_mode):
             return UploadOutcome(
                 attempted=True,
                 success=False,
@@ -295,21 +328,23 @@ class UploadService:
         remote_path = self.webdav.build_remote_path(relative_path)
         destination = self.webdav.destination_url(remote_path)
         origin_destination = self.webdav.destination_origin_url(remote_path)
-        file_hash = await self._sha256(file_path)
-
-        if await self.recorder.has_upload(
-            file_hash,
-            "webdav",
-            destination,
-        ):
+        file_hash = await self.recorder.get_upload_hash(
+            provider="webdav",
+            destination=destination,
+            local_path=local_path,
+            local_size=stat.st_size,
+            local_mtime=stat.st_mtime_ns,
+        )
+        if file_hash:
             await self.recorder.update_upload(
                 file_hash=file_hash,
                 provider="webdav",
                 destination=destination,
                 origin_destination=origin_destination,
-                local_path=str(file_path.resolve()),
-                local_size=file_path.stat().st_size,
+                local_path=local_path,
+                local_size=stat.st_size,
                 work_id=work_id,
+                local_mtime=stat.st_mtime_ns,
             )
             self.log.info(
                 _("已存在上传记录，跳过重复上传: {path}").format(path=destination),
@@ -322,8 +357,19 @@ class UploadService:
                 skipped=True,
             )
 
-        result = await self.webdav.ensure_uploaded(file_path, relative_path)
+        # 哈希与上传同时进行，上传结束后再取摘要写入记录
+        hash_task = create_task(self._sha256(file_path))
+        try:
+            result = await self.webdav.ensure_uploaded(
+                file_path,
+                relative_path,
+                stat.st_size,
+            )
+        except BaseException:
+            hash_task.cancel()
+            raise
         if not result.success:
+            hash_task.cancel()
             self.log.warning(
                 _("上传失败: {path}, 原因: {reason}").format(
                     path=result.destination,
@@ -338,14 +384,16 @@ class UploadService:
                 reason=result.reason,
             )
 
+        file_hash = await hash_task
         await self.recorder.update_upload(
             file_hash=file_hash,
             provider="webdav",
             destination=result.destination,
             origin_destination=origin_destination,
-            local_path=str(file_path.resolve()),
-            local_size=file_path.stat().st_size,
+            local_path=local_path,
+            local_size=stat.st_size,
             work_id=work_id,
+            local_mtime=stat.st_mtime_ns,
         )
         if result.already_exists:
             self.log.info(_("远端文件已存在，已补充上传记录: {path}").format(path=destination))
@@ -359,13 +407,14 @@ class UploadService:
             skipped=bool(result.already_exists),
         )
 
+    @staticmethod
+    def _stat_sync(path: Path) -> tuple[stat_result, str]:
+        return path.stat(), str(path.resolve())
+
     async def _sha256(self, path: Path) -> str:
         return await to_thread(self._sha256_sync, path)
 
     @staticmethod
     def _sha256_sync(path: Path) -> str:
-        digest = sha256()
         with path.open("rb") as file:
-            for chunk in iter(lambda: file.read(1024 * 1024), b""):
-                digest.update(chunk)
-        return digest.hexdigest()
+            return file_digest(file, sha256).hexdigest()
@@ -1,11 +1,14 @@
+from asyncio import Lock, to_thread
 from dataclasses import dataclass
+from mmap import ACCESS_READ, mmap
+from os import fstat
 from pathlib import Path, PurePosixPath
+from re import compile
 from typing import AsyncGenerator
-from urllib.parse import quote
+from urllib.parse import quote, unquote, urlsplit
 from xml.etree import ElementTree
 
-from aiofiles import open
-from httpx import AsyncClient, BasicAuth
+from httpx import AsyncClient, BasicAuth, Limits
 
 __all__ = ["WebDAVUploader", "WebDAVResult"]
 
@@ -20,6 +23,8 @@ class WebDAVResult:
 
 class WebDAVUploader:
     TEMP_SUFFIX = ".uploading"
+    MAX_CHUNK_SIZE = 1024 * 1024 * 4
+    CONTENT_LENGTH = compile(rb"getcontentlength[^>]*>\s*(\d+)\s*<")
 
     def __init__(
         self,
@@ -34,10 +39,15 @@ class WebDAVUploader:
         self.username = str(config.get("username", ""))
         self.password = str(config.get("password", ""))
         self.remote_root = self._normalize_remote_root(config.get("remote_root", ""))
+        self._remote_prefix = self.remote_root.rstrip("/")
         self.timeout = int(config.get("timeout", 30))
         self.verify_ssl = bool(config.get("verify_ssl", True))
+        self.verify_size = bool(config.get("verify_size", False))
         self.chunk_size = max(int(chunk_size or 0), 1024 * 256)
         self.log = logger
+        self._client: AsyncClient | None = None
+        self._client_lock = Lock()
+        self._known_dirs: set[str] = set()
 
     @staticmethod
     def _normalize_remote_root(value: str) -> str:
@@ -52,11 +62,7 @@ class WebDAVUploader:
         return self.enabled and bool(self.base_url)
 
     def build_remote_path(self, relative_path: Path) -> str:
-        path = PurePosixPath(relative_path.as_posix())
-        if self.remote_root == "/":
-            return f"/{path.as_posix().strip('/')}"
-        root = PurePosixPath(self.remote_root)
-        return f"/{(root / path).as_posix().strip('/')}"
+        return f"{self._remote_prefix}/{relative_path.as_posix().strip('/')}"
 
     def destination_url(self, remote_path: str) -> str:
         return f"{self.base_url}{self._encode_remote_path(remote_path)}"
@@ -66,17 +72,13 @@ class WebDAVUploader:
 
     @staticmethod
     def _encode_remote_path(remote_path: str) -> str:
-        segments = [
-            quote(segment, safe="")
-            for segment in str(remote_path).strip("/").split("/")
-            if segment
-        ]
-        return "/" + "/".join(segments)
+        return f"/{quote(str(remote_path).strip('/'), safe='/')}"
 
     async def ensure_uploaded(
         self,
         local_file: Path,
         relative_path: Path,
+        size: int | None = None,
     ) -> WebDAVResult:
         remote_path = self.build_remote_path(relative_path)
         destination = self.destination_url(remote_path)
@@ -87,83 +89,104 @@ class WebDAVUploader:
                 reason="WebDAV 未启用或配置不完整",
             )
         try:
-            async with self._create_client() as client:
+            client = await self._get_client()
+            if size is None:
                 size = local_file.stat().st_size
+            temp_path = f"{remote_path}{self.TEMP_SUFFIX}"
+            listing = await self._propfind_children(
+                client,
+                str(PurePosixPath(remote_path).parent),
+            )
+            if listing is None:
                 final_size = await self._get_remote_size(client, remote_path)
-                if final_size == size:
-                    return WebDAVResult(
-                        success=True,
-                        destination=destination,
-                        already_exists=True,
-                    )
+            else:
+                final_size = listing.get(remote_path)
+            if final_size == size:
+                return WebDAVResult(
+                    success=True,
+                    destination=destination,
+                    already_exists=True,
+                )
+
+            if not await self._ensure_remote_directory(client, remote_path):
+                return WebDAVResult(
+                    success=False,
+                    destination=destination,
+                    reason="创建 WebDAV 目录失败",
+                )
 
-                if not await self._ensure_remote_directory(client, remote_path):
+            if listing is None:
+                resume_from = await self._get_remote_size(client, temp_path)
+            else:
+                resume_from = listing.get(temp_path)
+            if resume_from is None:
+                resume_from = 0
+            if resume_from > size:
+                await self._delete(client, temp_path)
+                resume_from = 0
+
+            if resume_from < size:
+                ok = await self._put_file(
+                    client,
+                    temp_path,
+                    local_file,
+                    start=resume_from,
+                    total=size,
+                )
+                if not ok:
                     return WebDAVResult(
                         success=False,
                         destination=destination,
-                        reason="创建 WebDAV 目录失败",
+                        reason="上传失败",
                     )
 
-                temp_path = f"{remote_path}{self.TEMP_SUFFIX}"
-                resume_from = await self._get_remote_size(client, temp_path)
-                if resume_from is None:
-                    resume_from = 0
-                if resume_from > size:
-                    await self._delete(client, temp_path)
-                    resume_from = 0
-
-                if resume_from < size:
-                    ok = await self._put_file(
-                        client,
-                        temp_path,
-                        local_file,
-                        start=resume_from,
-                        total=size,
-                    )
-                    if not ok:
-                        return WebDAVResult(
-                            success=False,
-                            destination=destination,
-                            reason="上传失败",
-                        )
-
+                # 整文件 PUT 成功时 Content-Length 已保证字节数一致，续传仍需校验
+                if resume_from or self.verify_size:
                     current = await self._get_remote_size(client, temp_path)
-                    if current != size:
-                        if resume_from:
-                            self.log.warning(
-                                "WebDAV 服务端不支持断点续传，已回退为整文件重传"
-                            )
-                            await self._delete(client, temp_path)
-                            ok = await self._put_file(
-                                client,
-                                temp_path,
-                                local_file,
-                                start=0,
-                                total=size,
-                            )
-                            if not ok:
-                                return WebDAVResult(
-                                    success=False,
-                                    destination=destination,
-                                    reason="回退重传失败",
-                                )
-                            current = await self._get_remote_size(client, temp_path)
-                        if current != size:
+                else:
+                    current = size
+                if current != size:
+                    if resume_from:
+                        self.log.warning(
+                            "WebDAV 服务端不支持断点续传，已回退为整文件重传"
+                        )
+                        await self._delete(client, temp_path)
+                        ok = await self._put_file(
+                            client,
+                            temp_path,
+                            local_file,
+                            start=0,
+                            total=size,
+                        )
+                        if not ok:
                             return WebDAVResult(
                                 success=False,
                                 destination=destination,
-                                reason="上传后文件大小校验失败",
+                                reason="回退重传失败",
                             )
+                        if self.verify_size:
+                            current = await self._get_remote_size(
+                                client,
+                                temp_path,
+                            )
+                        else:
+                            current = size
+                    if current != size:
+                        return WebDAVResult(
+                            success=False,
+                            destination=destination,
+                            reason="上传后文件大小校验失败",
+                        )
 
-                moved = await self._move(client, temp_path, remote_path)
-                if not moved:
-                    return WebDAVResult(
-                        success=False,
-                        destination=destination,
-                        reason="上传完成但重命名失败",
-                    )
+            moved = await self._move(client, temp_path, remote_path)
+            if not moved:
+                return WebDAVResult(
+                    success=False,
+                    destination=destination,
+                    reason="上传完成但重命名失败",
+                )
 
-                return WebDAVResult(success=True, destination=destination)
+            return WebDAVResult(success=True, destination=destination)
         except Exception as exc:
             return WebDAVResult(
                 success=False,
@@ -171,6 +194,18 @@ class WebDAVUploader:
                 reason=repr(exc),
             )
 
+    async def _get_client(self) -> AsyncClient:
+        async with self._client_lock:
+            if self._client is None or self._client.is_closed:
+                self._client = self._create_client()
+            return self._client
+
+    async def aclose(self) -> None:
+        async with self._client_lock:
+            if self._client:
+                await self._client.aclose()
+                self._client = None
+
     def _create_client(self) -> AsyncClient:
         auth = None
         if self.username:
@@ -180,6 +215,7 @@ class WebDAVUploader:
             verify=self.verify_ssl,
             follow_redirects=True,
             auth=auth,
+            limits=Limits(max_keepalive_connections=8, max_connections=16),
             headers={
                 "User-Agent": "DouK-Downloader-WebDAV",
             },
@@ -191,19 +227,27 @@ class WebDAVUploader:
             return True
 
         current = PurePosixPath("/")
+        ancestors = []
         for segment in parent.parts:
             if segment == "/":
                 continue
             current = current / segment
-            url = self.destination_url(str(current))
+            ancestors.append(str(current))
+        for directory in ancestors:
+            if directory in self._known_dirs:
+                continue
+            url = self.destination_url(directory)
             response = await client.request("MKCOL", url)
             if response.status_code in (200, 201, 204, 301, 302, 405):
+                self._known_dirs.add(directory)
                 continue
             if response.status_code == 400:
                 # 一些 WebDAV 服务（如部分 NAS）在目录已存在时返回 400
-                if await self._resource_exists(client, str(current)):
+                if await self._resource_exists(client, directory):
+                    self._known_dirs.add(directory)
                     continue
                 return False
+            self._known_dirs.difference_update(ancestors)
             if response.status_code == 409:
                 return False
             if response.status_code in (401, 403):
@@ -260,8 +304,10 @@ class WebDAVUploader:
             return None
         if response.status_code not in (200, 207):
             return None
+        if match := self.CONTENT_LENGTH.search(response.content):
+            return int(match.group(1))
         try:
-            root = ElementTree.fromstring(response.text)
+            root = ElementTree.fromstring(response.content)
         except ElementTree.ParseError:
             return None
         for node in root.iter():
@@ -272,6 +318,44 @@ class WebDAVUploader:
                 return int(text)
         return None
 
+    async def _propfind_children(
+        self,
+        client: AsyncClient,
+        parent: str,
+    ) -> dict[str, int] | None:
+        response = await client.request(
+            "PROPFIND",
+            self.destination_url(parent),
+            headers={"Depth": "1"},
+        )
+        if response.status_code == 404:
+            return {}
+        if response.status_code not in (200, 207):
+            return None
+        try:
+            root = ElementTree.fromstring(response.content)
+        except ElementTree.ParseError:
+            return None
+        prefix = urlsplit(self.base_url).path.rstrip("/")
+        sizes = {}
+        for item in root.iter():
+            if not str(item.tag).endswith("response"):
+                continue
+            href = length = None
+            for node in item.iter():
+                tag = str(node.tag)
+                if tag.endswith("href"):
+                    href = str(node.text or "").strip()
+                elif tag.endswith("getcontentlength"):
+                    length = str(node.text or "").strip()
+            if not href or not length or not length.isdigit():
+                continue
+            path = unquote(urlsplit(href).path).rstrip("/")
+            if prefix and path.startswith(prefix):
+                path = path[len(prefix) :]
+            sizes[f"/{path.lstrip('/')}"] = int(length)
+        return sizes
+
     @staticmethod
     def _parse_content_length(value: str | None) -> int | None:
         if not value:
@@ -298,15 +382,21 @@ class WebDAVUploader:
         response = await client.put(
             url,
             headers=headers,
-            content=self._iter_file(local_file, start),
+            content=self._iter_file(local_file, start, self._chunk_for(total)),
         )
         if response.status_code in (200, 201, 204):
             return True
+        if response.status_code == 409:
+            # 远端目录可能已被删除，下次上传时重新创建
+            self._known_dirs.clear()
         self.log.warning(
             f"WebDAV 上传失败: {response.status_code}, URL: {url}, start={start}"
         )
         return False
 
+    def _chunk_for(self, size: int) -> int:
+        return max(self.chunk_size, min(self.MAX_CHUNK_SIZE, size // 64))
+
     async def _move(
         self,
         client: AsyncClient,
@@ -339,9 +429,15 @@ class WebDAVUploader:
         self,
         local_file: Path,
         start: int,
+        chunk_size: int,
     ) -> AsyncGenerator[bytes, None]:
-        async with open(local_file, "rb") as file:
-            if start:
-                await file.seek(start)
-            while chunk := await file.read(self.chunk_size):
-                yield chunk
+        with local_file.open("rb") as file:
+            size = fstat(file.fileno()).st_size
+            if size <= start:
+                return
+            with mmap(file.fileno(), 0, access=ACCESS_READ) as buffer:
+                for offset in range(start, size, chunk_size):
+                    yield await to_thread(
+                        buffer.__getitem__,
+                        slice(offset, offset + chunk_size),
+                    )